@@ -1,4 +1,6 @@
 const { createApp } = Vue
+// Idempotency-Key of the pending submission to each URL
+const idempotencyKeys = {}
 createApp({
 	delimiters: ['${', '}$'],
 	mixins: [window.mix ? window.mix : {}],
@@ -18,6 +20,22 @@ createApp({
 			}
 			return cookieValue
 		},
+		postOnce(url, payload) {
+			// Repeated submissions send the same key until one succeeds, so
+			// the server answers retries without placing an order twice
+			if (!idempotencyKeys[url]) {
+				const bytes = crypto.getRandomValues(new Uint8Array(16))
+				idempotencyKeys[url] = Array.from(bytes, (byte) =>
+					byte.toString(16).padStart(2, '0')
+				).join('')
+			}
+			return this.postData(url, payload, {
+				'Idempotency-Key': idempotencyKeys[url],
+			}).then((response) => {
+				delete idempotencyKeys[url]
+				return response
+			})
+		},
 		postData(url, payload, headers = {}) {
 			return axios
 				.post(url, payload, {
@@ -78,6 +96,14 @@ createApp({
 					this.basket = {}
 				})
 		},
+		getBasketSummary() {
+			this.getData('/api/basket/summary')
+				.then((data) => (this.basketSummary = data))
+				.catch(() => {
+					console.warn('Ошибка при получении корзины')
+					this.basketSummary = null
+				})
+		},
 		// getLastOrder() {
 		// 	this.getData('/api/orders/active/')
 		// 		.then(data => {
@@ -98,6 +124,7 @@ createApp({
 			this.postData('/api/basket', { id, count })
 				.then(({ data }) => {
 					this.basket = data
+					this.basketSummary = null
 				})
 				.catch(() => {
 					console.warn('Ошибка при добавлении заказа в корзину')
@@ -114,6 +141,7 @@ createApp({
 				})
 				.then(({ data }) => {
 					this.basket = data
+					this.basketSummary = null
 				})
 				.catch(() => {
 					console.warn('Ошибка при удалении заказа из корзины')
@@ -127,6 +155,9 @@ createApp({
 	},
 	computed: {
 		basketCount() {
+			if (this.basketSummary) {
+				return this.basketSummary
+			}
 			return (
 				(this.basket &&
 					Object.values(this.basket)?.reduce(
@@ -166,6 +197,8 @@ createApp({
 			cart: [],
 			paymentData: {},
 			basket: {},
+			// header badge totals, until the basket itself is loaded
+			basketSummary: null,
 			// order: {
 			// 	orderId: null,
 			// 	createdAt: '',
@@ -185,7 +218,11 @@ createApp({
 	},
 	mounted() {
 		this.getCategories()
-		this.getBasket()
+		if (location.pathname.startsWith('/cart')) {
+			this.getBasket()
+		} else {
+			this.getBasketSummary()
+		}
 		// this.getLastOrder()
 	},
 }).mount('#site')
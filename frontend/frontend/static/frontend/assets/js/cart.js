@@ -1,7 +1,7 @@
 var mix = {
     methods: {
         submitBasket () {
-            this.postData('/api/orders', Object.values(this.basket))
+            this.postOnce('/api/orders', Object.values(this.basket))
                 .then(({data: { orderId }}) => {
                     location.assign(`/orders/${orderId}/`)
                 }).catch(() => {
@@ -1,6 +1,12 @@
 from django.contrib import admin
 
-from app_orders.models import ProductsInOrder, Order
+from app_orders.models import (
+    Cart,
+    CartItem,
+    ProductsInOrder,
+    Order,
+    StockReservation,
+)
 
 
 class ProductsInOrderInline(admin.TabularInline):
@@ -35,3 +41,24 @@ class ProductsInOrderAdmin(admin.ModelAdmin):
         "order__city",
         "order__address",
     )
+
+
+class CartItemInline(admin.TabularInline):
+    model = CartItem
+    extra = 0
+
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_display = ("pk", "user", "createdAt")
+    search_fields = ("user__username",)
+    inlines = [CartItemInline]
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ("order", "product", "count", "expiresAt")
+    list_filter = ("expiresAt",)
+    search_fields = ("order__user__username", "product__title")
+    # Editing reservations by hand would put them out of step with the stock
+    readonly_fields = ("order", "product", "count", "expiresAt")
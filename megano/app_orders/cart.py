@@ -1,7 +1,22 @@
 from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
 
 from app_products.models import Product
-from megano import settings
+from app_products.pricing import current_prices
+
+from .models import Cart as StoredCart
+from .models import CartItem
+
+
+class CartLine(NamedTuple):
+    count: int
+    price: Decimal
 
 
 class Cart(object):
@@ -13,15 +28,36 @@ class Cart(object):
         self.session = request.session
         self.cart = self.session.get(settings.CART_SESSION_ID, {})
 
+    @classmethod
+    def merge(cls, request, user) -> None:
+        """Hands the cart of an anonymous visitor over to the user logging in."""
+
+        # The session survives login, and so does the cart stored in it
+
     def add(self, product, count):
         """Adding a product to the cart, updating its quantity."""
 
         product_id = str(product.id)
-        cart_item = self.cart.get(product_id, {"count": 0, "price": str(product.price)})
+        cart_item = self.cart.get(
+            product_id, {"count": 0, "price": str(product.current_price)}
+        )
         cart_item["count"] += int(count)
         self.cart[product_id] = cart_item
         self.save()
 
+    def reprice(self):
+        """Updating the prices of the products in the cart to current ones."""
+
+        prices = current_prices(int(product_id) for product_id in self.cart)
+        changed = False
+        for product_id, cart_item in self.cart.items():
+            price = prices.get(int(product_id))
+            if price is not None and Decimal(cart_item["price"]) != price:
+                cart_item["price"] = str(price)
+                changed = True
+        if changed:
+            self.save()
+
     def save(self):
         """Saving the cart."""
 
@@ -50,10 +86,21 @@ class Cart(object):
         products = Product.objects.filter(id__in=product_ids)
         for product in products:
             cart_item = self.cart[str(product.id)]
-            cart_item["product"] = product
-            cart_item["price"] = Decimal(cart_item["price"])
-            cart_item["total_price"] = cart_item["price"] * cart_item["count"]
-            yield cart_item
+            price = Decimal(cart_item["price"])
+            yield {
+                "count": cart_item["count"],
+                "price": price,
+                "product": product,
+                "total_price": price * cart_item["count"],
+            }
+
+    def snapshot(self) -> Dict[int, CartLine]:
+        """The contents keyed by product id, with decimal prices."""
+
+        return {
+            int(product_id): CartLine(item["count"], Decimal(item["price"]))
+            for product_id, item in self.cart.items()
+        }
 
     def total_count(self):
         """Counting all products in the cart."""
@@ -70,3 +117,131 @@ class Cart(object):
     def clear(self):
         self.session[settings.CART_SESSION_ID] = {}
         self.session.modified = True
+
+
+class DatabaseCart(Cart):
+    """
+    Cart kept in the Cart and CartItem tables instead of the session. A
+    user's cart follows them across devices; an anonymous visitor's cart
+    is found through its id in the session, which is written once, when
+    the cart is created. Every change touches a single item row.
+
+    `cart` offers the same `{product id: {"count", "price"}}` view of the
+    contents as the session cart, loaded with one query.
+    """
+
+    def __init__(self, request):
+        self.session = request.session
+        self.user = request.user if request.user.is_authenticated else None
+        self.cart_id = self.find_cart_id()
+
+    @classmethod
+    def merge(cls, request, user) -> None:
+        """Gives the anonymous cart to the user, or adds its items to theirs."""
+
+        cart_id = request.session.pop(settings.CART_ID_SESSION_KEY, None)
+        if cart_id is None:
+            return
+
+        anonymous = StoredCart.objects.filter(pk=cart_id, user__isnull=True)
+        with transaction.atomic():
+            if not StoredCart.objects.filter(user=user).exists():
+                anonymous.update(user=user)
+                return
+
+            user_cart = StoredCart.objects.get(user=user)
+            for item in CartItem.objects.filter(cart__in=anonymous):
+                add_item(user_cart.pk, item.product_id, item.count, item.price)
+            anonymous.delete()
+
+    def find_cart_id(self) -> Optional[int]:
+        if self.user is not None:
+            carts = StoredCart.objects.filter(user=self.user)
+        else:
+            cart_id = self.session.get(settings.CART_ID_SESSION_KEY)
+            if cart_id is None:
+                return None
+            carts = StoredCart.objects.filter(pk=cart_id, user__isnull=True)
+        return carts.values_list("pk", flat=True).first()
+
+    def create_cart(self) -> int:
+        if self.user is not None:
+            return StoredCart.objects.get_or_create(user=self.user)[0].pk
+        cart_id = StoredCart.objects.create().pk
+        self.session[settings.CART_ID_SESSION_KEY] = cart_id
+        return cart_id
+
+    @cached_property
+    def cart(self) -> Dict[str, Dict[str, Any]]:
+        if self.cart_id is None:
+            return {}
+        rows = CartItem.objects.filter(cart_id=self.cart_id).values_list(
+            "product_id", "count", "price"
+        )
+        return {
+            str(product_id): {"count": count, "price": str(price)}
+            for product_id, count, price in rows
+        }
+
+    def save(self):
+        """Items are written as they change; drops the loaded contents."""
+
+        self.__dict__.pop("cart", None)
+
+    def add(self, product, count):
+        if self.cart_id is None:
+            self.cart_id = self.create_cart()
+        add_item(self.cart_id, product.pk, int(count), product.current_price)
+        self.save()
+
+    def remove(self, product, count):
+        if self.cart_id is None:
+            return
+        items = CartItem.objects.filter(cart_id=self.cart_id, product_id=product.pk)
+        if count != 1 or not items.filter(count__gt=1).update(count=F("count") - 1):
+            items.delete()
+        self.save()
+
+    def reprice(self):
+        prices = current_prices(int(product_id) for product_id in self.cart)
+        changed = False
+        for product_id, cart_item in self.cart.items():
+            price = prices.get(int(product_id))
+            if price is not None and Decimal(cart_item["price"]) != price:
+                CartItem.objects.filter(
+                    cart_id=self.cart_id, product_id=product_id
+                ).update(price=price)
+                changed = True
+        if changed:
+            self.save()
+
+    def clear(self):
+        if self.cart_id is not None:
+            CartItem.objects.filter(cart_id=self.cart_id).delete()
+        self.save()
+
+
+def add_item(cart_id: int, product_id: int, count: int, price: Decimal) -> None:
+    """Adds `count` units to a cart row, creating it at `price` if needed."""
+
+    items = CartItem.objects.filter(cart_id=cart_id, product_id=product_id)
+    if items.update(count=F("count") + count):
+        return
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(
+                cart_id=cart_id, product_id=product_id, count=count, price=price
+            )
+    except IntegrityError:
+        # Created concurrently since the update
+        items.update(count=F("count") + count)
+
+
+def get_cart(request) -> Cart:
+    """Returns the cart of the request, stored by `CART_BACKEND`."""
+
+    return get_cart_class()(request)
+
+
+def get_cart_class() -> type:
+    return import_string(settings.CART_BACKEND)
@@ -0,0 +1,157 @@
+"""
+Idempotency keys for order requests.
+
+A client that may retry a POST sends the same `Idempotency-Key` header
+with every attempt. The first attempt claims the key in the
+`IdempotencyKey` table and stores its response when it succeeds. Retries
+get the stored response back without running the view, or a 409 while
+the first attempt is still running. Keys are kept per user, or per
+session for visitors, for IDEMPOTENCY_KEY_TIMEOUT seconds.
+
+Failed attempts give their key up, so a retry runs the request again. A
+claim whose request died without answering can be taken over after
+IDEMPOTENCY_LOCK_TIMEOUT seconds.
+"""
+
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+
+
+def get_owner(request: Request) -> Optional[str]:
+    if request.user.is_authenticated:
+        return "user:{pk}".format(pk=request.user.pk)
+    if request.session.session_key:
+        return "session:{key}".format(key=request.session.session_key)
+    return None
+
+
+def get_fingerprint(request: Request) -> str:
+    """
+    Keyed digest of the parsed request body, insensitive to key order, so
+    stored fingerprints cannot be matched against guessed bodies, e.g.
+    card numbers.
+    """
+
+    body = json.dumps(request.data, cls=DjangoJSONEncoder, sort_keys=True)
+    return hmac.new(
+        settings.SECRET_KEY.encode(), body.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def claim_key(owner: str, key: str, path: str, fingerprint: str) -> bool:
+    """
+    Takes a key for a request about to run, unless another request holds
+    it or answered under it and neither the claim nor the answer expired.
+    """
+
+    now = timezone.now()
+    claim = {
+        "path": path,
+        "fingerprint": fingerprint,
+        "status_code": None,
+        "response": None,
+        "expiresAt": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+    }
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(owner=owner, key=key, **claim)
+        return True
+    except IntegrityError:
+        return bool(
+            IdempotencyKey.objects.filter(
+                owner=owner, key=key, expiresAt__lte=now
+            ).update(createdAt=now, **claim)
+        )
+
+
+def replay(owner: str, key: str, path: str, fingerprint: str) -> Response:
+    stored = (
+        IdempotencyKey.objects.filter(owner=owner, key=key)
+        .values("path", "fingerprint", "status_code", "response")
+        .first()
+    )
+    if stored is None or stored["status_code"] is None:
+        # Held by a running request, or given up by it a moment ago
+        return Response(
+            {"error": "A request with this idempotency key is in progress."},
+            status=status.HTTP_409_CONFLICT,
+            headers={"Retry-After": "1"},
+        )
+    if stored["path"] != path or stored["fingerprint"] != fingerprint:
+        return Response(
+            {"error": "The idempotency key was used for another request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+    response = Response(stored["response"], status=stored["status_code"])
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(post: Callable[..., Response]) -> Callable[..., Response]:
+    """
+    Runs the decorated `post` of a view at most once per `Idempotency-Key`.
+    Requests without the header run as before. Successful responses are
+    stored as they are, so they must not echo the request, e.g. card data.
+    """
+
+    @wraps(post)
+    def wrapper(view, request: Request, *args: Any, **kwargs: Any) -> Response:
+        key = request.headers.get(HEADER)
+        owner = get_owner(request)
+        if not key or owner is None:
+            return post(view, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            return Response(
+                {"error": "The idempotency key is too long."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        path = request.path
+        fingerprint = get_fingerprint(request)
+        if not claim_key(owner, key, path, fingerprint):
+            return replay(owner, key, path, fingerprint)
+
+        stored = IdempotencyKey.objects.filter(owner=owner, key=key)
+        try:
+            response = post(view, request, *args, **kwargs)
+        except BaseException:
+            stored.delete()
+            raise
+
+        if status.is_success(response.status_code):
+            stored.update(
+                status_code=response.status_code,
+                response=response.data,
+                expiresAt=timezone.now()
+                + timedelta(seconds=settings.IDEMPOTENCY_KEY_TIMEOUT),
+            )
+        else:
+            stored.delete()
+        return response
+
+    return wrapper
+
+
+def clear_expired_keys(batch_size: int) -> int:
+    """Deletes up to `batch_size` expired keys and returns how many."""
+
+    expired = IdempotencyKey.objects.filter(expiresAt__lte=timezone.now())
+    pks = list(expired.values_list("pk", flat=True)[:batch_size])
+    return expired.filter(pk__in=pks).delete()[0]
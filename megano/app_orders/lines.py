@@ -0,0 +1,58 @@
+"""
+Order lines written in bulk.
+
+Confirming an order writes all of its lines with a constant number of
+statements, however many products it has: one read of the stored lines,
+one upsert on the (order, product) constraint and one update of the
+popularity of the products whose units changed. `bulk_create` sends no
+signals, so the sales the per-row receivers would record are recorded
+here; lines dropped on a new confirmation are deleted with their
+receivers.
+"""
+
+from typing import Dict, Iterable, List
+
+from app_products.models import Product
+from app_products.popularity import record_sales
+
+from .models import Order, ProductsInOrder
+
+
+def unknown_products(product_ids: Iterable[int]) -> List[int]:
+    """Ids among `product_ids` of products that do not exist, in one query."""
+
+    product_ids = set(product_ids)
+    known = Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True)
+    return sorted(product_ids - set(known))
+
+
+def set_order_lines(order: Order, lines: Dict[int, int]) -> None:
+    """
+    Makes `lines` ({product id: units}) the lines of an order, updating
+    the counts of products it already had and removing the others.
+    """
+
+    stored_lines = ProductsInOrder.objects.filter(order=order)
+    stored = dict(stored_lines.values_list("product_id", "count"))
+
+    ProductsInOrder.objects.bulk_create(
+        [
+            ProductsInOrder(order=order, product_id=product_id, count=count)
+            for product_id, count in lines.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["order", "product"],
+        update_fields=["count"],
+    )
+    dropped = set(stored) - set(lines)
+    if dropped:
+        stored_lines.filter(product_id__in=dropped).delete()
+
+    units = {
+        product_id: count - stored.get(product_id, 0)
+        for product_id, count in lines.items()
+    }
+    record_sales(
+        order.createdAt,
+        {product_id: count for product_id, count in units.items() if count},
+    )
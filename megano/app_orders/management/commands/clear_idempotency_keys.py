@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app_orders.idempotency import clear_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Deletes idempotency keys whose responses are no longer replayed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.IDEMPOTENCY_BATCH_SIZE,
+            help="Keys deleted per statement.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            deleted = clear_expired_keys(options["batch_size"])
+            total += deleted
+            if not deleted:
+                break
+
+        self.stdout.write(
+            self.style.SUCCESS("Deleted {count} keys.".format(count=total))
+        )
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app_orders.stock import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Returns the stock held by unpaid orders whose reservations expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.STOCK_RESERVATION_BATCH_SIZE,
+            help="Orders released per transaction.",
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep waiting for reservations to expire instead of exiting.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10.0,
+            help="Seconds to wait between polls when nothing has expired.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            released = release_expired_reservations(options["batch_size"])
+            total += released
+            if released:
+                continue
+            if not options["follow"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS("Released {count} orders.".format(count=total))
+        )
@@ -0,0 +1,61 @@
+# Generated by Django 5.0 on 2026-10-18 17:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_orders", "0003_cart"),
+        ("app_products", "0016_image_renditions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField()),
+                ("expiresAt", models.DateTimeField(verbose_name="Expires at")),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="app_orders.order",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="app_products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stock reservation",
+                "verbose_name_plural": "Stock reservations",
+                "indexes": [
+                    models.Index(
+                        fields=["expiresAt"], name="stock_reservation_expiry_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stockreservation",
+            constraint=models.UniqueConstraint(
+                fields=("order", "product"), name="stock_reservation_unique_product"
+            ),
+        ),
+    ]
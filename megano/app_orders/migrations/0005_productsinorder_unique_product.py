@@ -0,0 +1,42 @@
+# Generated by Django 5.0 on 2026-10-18 18:06
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_lines(apps, schema_editor):
+    """
+    Keeps one line of each product confirmed more than once in an order,
+    the one with the most units, e.g. not an empty line added by a second
+    confirmation.
+    """
+
+    ProductsInOrder = apps.get_model("app_orders", "ProductsInOrder")
+
+    duplicates = (
+        ProductsInOrder.objects.values_list("order", "product")
+        .annotate(lines=Count("pk"))
+        .filter(lines__gt=1)
+        .order_by()
+    )
+    for order, product, _ in duplicates:
+        lines = ProductsInOrder.objects.filter(order=order, product=product)
+        kept = lines.order_by("-count", "-pk").values_list("pk", flat=True)[0]
+        lines.exclude(pk=kept).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_orders", "0004_stock_reservation"),
+        ("app_products", "0016_image_renditions"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="productsinorder",
+            constraint=models.UniqueConstraint(
+                fields=("order", "product"), name="products_in_order_unique_product"
+            ),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 from app_products.models import Product
@@ -55,3 +57,118 @@ class ProductsInOrder(models.Model):
         Product, on_delete=models.PROTECT, related_name="products_in_orders"
     )
     count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "product"], name="products_in_order_unique_product"
+            ),
+        ]
+
+
+class Cart(models.Model):
+    """
+    A shopping cart stored by `app_orders.cart.DatabaseCart`, owned by a
+    user or by the anonymous session that keeps its id.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="cart",
+        verbose_name="User",
+    )
+    createdAt = models.DateTimeField(auto_now_add=True, verbose_name="Date of creation")
+
+    class Meta:
+        verbose_name = "Cart"
+        verbose_name_plural = "Carts"
+
+    def __str__(self):
+        return "Cart {pk}".format(pk=self.pk)
+
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="cart_items"
+    )
+    count = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Cart item"
+        verbose_name_plural = "Cart items"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cart", "product"], name="cart_item_unique_product"
+            ),
+        ]
+
+
+class StockReservation(models.Model):
+    """
+    Units of a product taken from stock for an unpaid order. Paying for the
+    order keeps them sold; `release_reservations` returns them to stock
+    once `expiresAt` passes.
+    """
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="reservations"
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="reservations"
+    )
+    count = models.PositiveIntegerField()
+    expiresAt = models.DateTimeField(verbose_name="Expires at")
+
+    class Meta:
+        verbose_name = "Stock reservation"
+        verbose_name_plural = "Stock reservations"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "product"], name="stock_reservation_unique_product"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["expiresAt"], name="stock_reservation_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return "{count} x {product} for order {order}".format(
+            count=self.count, product=self.product_id, order=self.order_id
+        )
+
+
+class IdempotencyKey(models.Model):
+    """
+    The response to a POST sent with an `Idempotency-Key` header, replayed
+    to retries with the same key instead of running the request again.
+    A key without a response is held by a request still running.
+    """
+
+    owner = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    createdAt = models.DateTimeField(auto_now_add=True, verbose_name="Date of creation")
+    expiresAt = models.DateTimeField(verbose_name="Expires at")
+
+    class Meta:
+        verbose_name = "Idempotency key"
+        verbose_name_plural = "Idempotency keys"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "key"], name="idempotency_key_unique_owner"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["expiresAt"], name="idempotency_key_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return "{key} of {owner}".format(key=self.key, owner=self.owner)
@@ -1,68 +1,47 @@
-from decimal import Decimal
+from typing import Any, Dict, List
 
-from django.db.models import Avg
 from rest_framework import serializers
 
+from .cart import CartLine
 from .models import Order
-from app_products.models import Product
-from app_products.serializers import (
-    ImageSerializer,
-    TagSerializer,
-    CatalogItemSerializer,
-)
+from app_products.fields import CachedDateTimeField
+from app_products.serializers import CatalogItemSerializer
+from app_products.value_serializers import LimitedProductValuesSerializer
 
 
-class BasketSerializer(serializers.ModelSerializer):
-    """Serializing a shopping cart."""
-
-    date = serializers.DateTimeField(format="%a %b %d %Y %H:%M:%S GMT%z (%Z)")
-    count = serializers.SerializerMethodField()
-    price = serializers.SerializerMethodField()
-    images = ImageSerializer(many=True)
-    tags = TagSerializer(many=True)
-    reviews = serializers.SerializerMethodField()
-    rating = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Product
-        fields = [
-            "id",
-            "category",
-            "price",
-            "count",
-            "date",
-            "title",
-            "description",
-            "freeDelivery",
-            "images",
-            "tags",
-            "reviews",
-            "rating",
-        ]
-
-    def get_count(self, obj):
-        return self.context.get(str(obj.pk)).get("count")
-
-    def get_price(self, obj):
-        return Decimal(self.context.get(str(obj.pk)).get("price"))
-
-    def get_reviews(self, obj):
-        return obj.reviews.count()
-
-    def get_rating(self, obj):
-        average_rating = obj.reviews.aggregate(Avg("rate"))["rate__avg"]
-        return round(average_rating, 2) if average_rating is not None else 0
-
+class BasketValuesSerializer(LimitedProductValuesSerializer):
+    """
+    Product cards of the basket, built from `values()` rows of the products
+    and a snapshot of the cart (see `Cart.snapshot`).
+    """
 
-class DateTimeTZField(serializers.DateTimeField):
+    def __init__(
+        self, instance: Any, snapshot: Dict[int, CartLine], **kwargs: Any
+    ) -> None:
+        super().__init__(instance, **kwargs)
+        self.snapshot = snapshot
+
+    def to_representation(
+        self,
+        row: Dict[str, Any],
+        images: Dict[int, List[Dict[str, Any]]],
+        tags: Dict[int, List[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        card = super().to_representation(row, images, tags)
+        line = self.snapshot[row["id"]]
+        card["count"] = line.count
+        card["price"] = line.price
+        return card
+
+
+class DateTimeTZField(CachedDateTimeField):
     """
     A custom read-only field to handle datetime with timezone information.
     """
 
-    def to_representation(self, value):
-        if value is None:
-            return None
-        return value.strftime("%d.%m.%Y %H:%M")
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("format", "%d.%m.%Y %H:%M")
+        super().__init__(*args, **kwargs)
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -0,0 +1,63 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cart import get_cart_class
+from .models import Order, ProductsInOrder
+from .stock import lock_order, release_stock
+from app_products.popularity import record_sale
+
+
+@receiver(pre_save, sender=ProductsInOrder)
+def remember_order_line(sender, instance: ProductsInOrder, raw: bool, **kwargs):
+    """Keeps the stored product and count of an edited order line."""
+
+    instance._stored_line = None
+    if raw or instance.pk is None:
+        return
+    instance._stored_line = (
+        ProductsInOrder.objects.filter(pk=instance.pk)
+        .values_list("product_id", "count")
+        .first()
+    )
+
+
+@receiver(post_save, sender=ProductsInOrder)
+def add_units_sold(
+    sender, instance: ProductsInOrder, created: bool, raw: bool, **kwargs
+) -> None:
+    """Counts the units of an order line towards the product popularity."""
+
+    if raw:
+        return
+
+    date = instance.order.createdAt
+    stored = getattr(instance, "_stored_line", None)
+    if not created and stored is not None:
+        product_id, count = stored
+        record_sale(product_id, date, count, sign=-1)
+    record_sale(instance.product_id, date, instance.count)
+
+
+@receiver(post_delete, sender=ProductsInOrder)
+def remove_units_sold(sender, instance: ProductsInOrder, **kwargs) -> None:
+    record_sale(instance.product_id, instance.order.createdAt, instance.count, -1)
+
+
+@receiver(user_logged_in)
+def merge_cart(sender, request, user, **kwargs) -> None:
+    """Keeps what a visitor put in the cart before logging in."""
+
+    if request is not None:
+        get_cart_class().merge(request, user)
+
+
+@receiver(pre_delete, sender=Order)
+def release_order_stock(sender, instance: Order, **kwargs) -> None:
+    """Returns the units a deleted order still holds to stock."""
+
+    with transaction.atomic():
+        # Waits for a payment or a release of the order in progress
+        lock_order(instance)
+        release_stock([instance.pk])
@@ -0,0 +1,186 @@
+"""
+Stock reservations for orders.
+
+Placing an order takes the ordered units out of `Product.count` with a
+single conditional UPDATE for all of its lines:
+
+    UPDATE product SET count = count - n WHERE id IN (...) AND count >= n
+
+with `n` a CASE over the product ids. It either changes every line or the
+savepoint around it is rolled back, so concurrent checkouts never
+oversell and only wait on each other for the rows they share. The units
+are held as `StockReservation` rows until the order is paid, or until
+STOCK_RESERVATION_TIMEOUT passes and `release_reservations` returns them.
+
+Every change to the reservations of an order locks the order row first,
+so placing, paying for and releasing an order never interleave.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from app_products.cache import bump_generation_on_commit
+from app_products.models import Product
+
+from .models import Order, ProductsInOrder, StockReservation
+
+
+class OutOfStock(Exception):
+    """Some products of an order have fewer units in stock than ordered."""
+
+    def __init__(self, product_ids: Iterable[int] = ()) -> None:
+        self.product_ids = list(product_ids)
+        super().__init__(
+            "Not enough units in stock of products {ids}".format(ids=self.product_ids)
+        )
+
+
+def shift_stock(deltas: Dict[int, int]) -> int:
+    """
+    Takes `deltas` units ({product id: units}, negative to give them back)
+    from the stock of each product in one UPDATE, skipping products that
+    have fewer units left, and returns the number of products changed.
+    """
+
+    if not deltas:
+        return 0
+    units = Case(
+        *[When(pk=pk, then=Value(count)) for pk, count in deltas.items()],
+        output_field=models.IntegerField(),
+    )
+    changed = Product.objects.filter(pk__in=deltas, count__gte=units).update(
+        count=F("count") - units
+    )
+    if changed:
+        # Cached product responses show the stock
+        bump_generation_on_commit("product")
+    return changed
+
+
+def sum_lines(lines: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    totals = defaultdict(int)
+    for product_id, count in lines:
+        totals[int(product_id)] += int(count)
+    return {product_id: count for product_id, count in totals.items() if count}
+
+
+def take_stock(lines: Dict[int, int], held: Dict[int, int]) -> None:
+    """
+    Moves the stock held from `held` to `lines`, all or nothing, and raises
+    OutOfStock listing the products that fell short.
+    """
+
+    deltas = {
+        product_id: lines.get(product_id, 0) - held.get(product_id, 0)
+        for product_id in set(lines) | set(held)
+    }
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    try:
+        with transaction.atomic():
+            if shift_stock(deltas) < len(deltas):
+                raise OutOfStock()
+    except OutOfStock:
+        # Rolled back, so the stock read now is the one that fell short
+        stock = Product.objects.filter(pk__in=deltas).values_list("pk", "count")
+        raise OutOfStock(
+            sorted(pk for pk, count in stock if count < deltas[pk])
+            + sorted(set(deltas) - {pk for pk, _ in stock})
+        )
+
+
+def lock_order(order: Order) -> Optional[str]:
+    """Locks the row of an order and returns its stored status."""
+
+    return (
+        Order.objects.select_for_update()
+        .filter(pk=order.pk)
+        .values_list("status", flat=True)
+        .first()
+    )
+
+
+def reserve_stock(order: Order, lines: Iterable[Tuple[int, int]]) -> None:
+    """
+    Holds the units of `lines` ((product id, units) pairs) for an order for
+    STOCK_RESERVATION_TIMEOUT seconds, replacing what it held before.
+    Raises OutOfStock and keeps the previous reservations when a product
+    has too few units. Paid orders hold nothing, their units are sold.
+    """
+
+    lines = sum_lines(lines)
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TIMEOUT)
+    with transaction.atomic():
+        if lock_order(order) == "Paid":
+            return
+        reservations = StockReservation.objects.filter(order=order)
+        held = dict(reservations.values_list("product_id", "count"))
+        take_stock(lines, held)
+
+        reservations.delete()
+        StockReservation.objects.bulk_create(
+            StockReservation(
+                order=order, product_id=product_id, count=count, expiresAt=expires_at
+            )
+            for product_id, count in lines.items()
+        )
+
+
+def sell_stock(order: Order) -> None:
+    """
+    Turns the reservations of an order being paid into sales. When they
+    were already released, takes the units of its lines again, or raises
+    OutOfStock. Orders already paid for are left alone.
+    """
+
+    with transaction.atomic():
+        if lock_order(order) == "Paid":
+            return
+        if StockReservation.objects.filter(order=order).delete()[0]:
+            return
+        lines = sum_lines(
+            ProductsInOrder.objects.filter(order=order).values_list(
+                "product_id", "count"
+            )
+        )
+        take_stock(lines, {})
+
+
+def release_stock(order_ids: List[int]) -> int:
+    """
+    Gives the units reserved for orders, locked by the caller, back to
+    stock and returns the number of reservations released.
+    """
+
+    reservations = StockReservation.objects.filter(order_id__in=order_ids)
+    units = sum_lines(
+        (product_id, -count)
+        for product_id, count in reservations.values_list("product_id", "count")
+    )
+    shift_stock(units)
+    return reservations.delete()[0]
+
+
+def release_expired_reservations(batch_size: int) -> int:
+    """
+    Returns the stock of up to `batch_size` orders whose reservations have
+    expired and returns how many orders were released. Orders being placed
+    or paid for are skipped on databases that support `SKIP LOCKED`.
+    """
+
+    expired = StockReservation.objects.filter(expiresAt__lte=timezone.now())
+    with transaction.atomic():
+        order_ids = list(
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=expired.values("order_id"))
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if order_ids:
+            release_stock(order_ids)
+    return len(order_ids)
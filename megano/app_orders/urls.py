@@ -1,6 +1,12 @@
 from django.urls import path
 
-from .views import BasketOfProductsView, Orders, OrderDetail, PaymentView
+from .views import (
+    BasketOfProductsView,
+    BasketSummaryView,
+    Orders,
+    OrderDetail,
+    PaymentView,
+)
 
 app_name = "app_orders"
 
@@ -10,4 +16,5 @@ urlpatterns = [
     path("order/<int:pk>", OrderDetail.as_view()),
     path("payment/<int:pk>", PaymentView.as_view()),
     path("basket", BasketOfProductsView.as_view(), name="basket"),
+    path("basket/summary", BasketSummaryView.as_view(), name="basket_summary"),
 ]
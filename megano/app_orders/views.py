@@ -5,9 +5,12 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .cart import Cart
+from .cart import get_cart
+from .idempotency import idempotent
 from .models import Order, ProductsInOrder
-from .serializers import BasketSerializer, OrderSerializer
+from .serializers import BasketValuesSerializer, OrderSerializer
+from .lines import set_order_lines, unknown_products
+from .stock import OutOfStock, reserve_stock, sell_stock, sum_lines
 from app_products.models import Product
 
 
@@ -17,12 +20,12 @@ class BasketOfProductsView(APIView):
     """
 
     def get(self, request: Request, *args, **kwargs) -> Response:
-        cart = Cart(request)
+        cart = get_cart(request)
         serializer = self.get_serializer(cart)
         return Response(serializer.data)
 
     def post(self, request: Request, *args, **kwargs) -> Response:
-        cart = Cart(request)
+        cart = get_cart(request)
         product = get_object_or_404(Product, id=request.data.get("id"))
         count = int(request.data.get("count"))
         cart.add(product=product, count=count)
@@ -30,7 +33,7 @@ class BasketOfProductsView(APIView):
         return Response(serializer.data)
 
     def delete(self, request: Request, *args, **kwargs) -> Response:
-        cart = Cart(request)
+        cart = get_cart(request)
         product = get_object_or_404(Product, id=request.data.get("id"))
         count = request.data.get("count", None)
         cart.remove(product, count=count)
@@ -40,51 +43,86 @@ class BasketOfProductsView(APIView):
     def get_serializer(self, cart):
         """Retrieving products from the cart."""
 
-        products_in_cart = [product for product in cart.cart.keys()]
-        products = Product.objects.filter(pk__in=products_in_cart)
-        return BasketSerializer(products, many=True, context=cart.cart)
+        cart.reprice()
+        snapshot = cart.snapshot()
+        products = Product.objects.filter(pk__in=list(snapshot))
+        return BasketValuesSerializer(products, snapshot=snapshot)
+
+
+class BasketSummaryView(APIView):
+    """
+    Number of units and total price of the cart, for the header badge,
+    without loading products. Prices are brought up to date whenever the
+    basket itself is loaded or ordered.
+    """
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        cart = get_cart(request)
+        return Response({"count": cart.total_count(), "price": cart.total_price()})
+
+
+def out_of_stock(error: OutOfStock) -> Response:
+    return Response(
+        {"error": "Not enough products in stock.", "products": error.product_ids},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def get_orders():
+    """Orders with what `OrderSerializer` reads from related tables."""
+
+    return Order.objects.select_related("user__user").prefetch_related(
+        "products__images__renditions", "products__tags"
+    )
 
 
 class Orders(APIView):
     def get(self, request: Request) -> Response:
-        data = Order.objects.filter(user_id=request.user.profile.pk)
+        data = get_orders().filter(user_id=request.user.profile.pk)
         serialized = OrderSerializer(data, many=True)
         return Response(serialized.data)
 
+    @idempotent
     def post(self, request: Request, *args, **kwargs) -> Response:
         products_in_order = [
             (obj["id"], obj["count"], obj["price"]) for obj in request.data
         ]
-        print("products_in_order", products_in_order)
         product_ids = list(zip(*products_in_order))[0]
-        print("product_ids", product_ids)
 
+        try:
+            order = self.place_order(request, products_in_order, product_ids)
+        except OutOfStock as error:
+            return out_of_stock(error)
+
+        data = {"orderId": order.pk}
+        return Response(data)
+
+    def place_order(self, request: Request, products_in_order, product_ids) -> Order:
         with transaction.atomic():
-            cart = Cart(request)
-            print("cart")
+            cart = get_cart(request)
+            cart.reprice()
 
-            order, created = Order.objects.get_or_create(
+            # Retries of the same checkout are answered by `idempotent`
+            order = Order.objects.create(
                 user=request.user.profile,
                 totalCost=cart.total_price(),
             )
 
-            if not created:
-                # Если заказ уже существует, убедимся, что он не содержит другие продукты
-                order.products.clear()
-
             products = Product.objects.filter(id__in=product_ids)
-            print("products", products)
             order.products.set(products)
+            reserve_stock(
+                order,
+                [(product_id, count) for product_id, count, _ in products_in_order],
+            )
 
-        data = {"orderId": order.pk}
-        return Response(data)
+        return order
 
 
 class OrderDetail(APIView):
     def get(self, request: Request, pk) -> Response:
-        order = get_object_or_404(Order, pk=pk)
+        order = get_object_or_404(get_orders(), pk=pk)
         serialized = OrderSerializer(order)
-        cart = Cart(request).cart
+        cart = get_cart(request).cart
         data = serialized.data
 
         try:
@@ -100,40 +138,74 @@ class OrderDetail(APIView):
 
         return Response(data)
 
+    @idempotent
     def post(self, request: Request, pk) -> Response:
-        order = get_object_or_404(Order, pk=pk)
         data = request.data
+        lines = sum_lines(
+            (product["id"], product["count"]) for product in data["products"]
+        )
+        unknown = unknown_products(lines)
+        if unknown:
+            return Response(
+                {"error": "Unknown products.", "products": unknown},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            with transaction.atomic():
+                # Waits for a payment of the order in progress
+                order = get_object_or_404(Order.objects.select_for_update(), pk=pk)
+                if order.status == "Paid":
+                    return Response(
+                        {"error": "The order is already paid."},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                self.confirm(order, data)
+                # Holds the confirmed counts for another timeout from now
+                reserve_stock(order, lines.items())
+                order.save()
+                set_order_lines(order, lines)
+        except OutOfStock as error:
+            return out_of_stock(error)
+
+        get_cart(request).clear()
+        return Response({"orderId": order.pk}, status=status.HTTP_201_CREATED)
+
+    def confirm(self, order: Order, data) -> None:
+        """
+        Fills in the delivery details of an order. Delivery is charged on the
+        first confirmation only, later ones keep the confirmed delivery type
+        and total.
+        """
+
         order.fullName = data["fullName"]
         order.phone = data["phone"]
         order.email = data["email"]
-        order.deliveryType = data["deliveryType"]
         order.city = data["city"]
         order.address = data["address"]
         order.paymentType = data["paymentType"]
-        order.status = "Awaiting payment"
+        if order.status == "Awaiting payment":
+            return
 
+        order.status = "Awaiting payment"
+        order.deliveryType = data["deliveryType"]
         if data["deliveryType"] == "express":
             order.totalCost += 500
         elif order.totalCost < 2000:
             order.totalCost += 200
 
-        order.save()
-
-        for product in data["products"]:
-            product_id = product["id"]
-            count = product["count"]
-
-            ProductsInOrder.objects.get_or_create(
-                order_id=order.pk, product_id=product_id, count=count
-            )
-
-        Cart(request).clear()
-        return Response(request.data, status=status.HTTP_201_CREATED)
-
 
 class PaymentView(APIView):
+    @idempotent
     def post(self, request: Request, pk) -> Response:
         order = get_object_or_404(Order, pk=pk)
-        order.status = "Paid"
-        order.save()
-        return Response(request.data, status=status.HTTP_200_OK)
+        try:
+            with transaction.atomic():
+                sell_stock(order)
+                order.status = "Paid"
+                order.save()
+        except OutOfStock as error:
+            return out_of_stock(error)
+        return Response(
+            {"orderId": order.pk, "status": order.status}, status=status.HTTP_200_OK
+        )
@@ -13,6 +13,8 @@ from .models import (
     Review,
     Sale,
 )
+from .renditions import thumbnail_url
+from .search import get_search_backend
 
 
 @admin.register(Category)
@@ -30,6 +32,14 @@ class CategoryAdmin(admin.ModelAdmin):
     list_filter = ["is_active", "favourite"]
     search_fields = ["title"]
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("image")
+            .prefetch_related("image__renditions")
+        )
+
     @admin.display(description="Parent Category")
     def parent(self, obj):
         return obj.parent.title if obj.parent else None
@@ -39,10 +49,11 @@ class CategoryAdmin(admin.ModelAdmin):
         return format_html(
             '<div style="display: flex; align-items: center; justify-content: center;">'
             '   <a href="{0}" target="_blank">'
-            '       <img src="{0}" height="50" style="border-radius: 10%">'
+            '       <img src="{1}" height="50" style="border-radius: 10%">'
             "   </a>"
             "</div>",
             obj.image.src.url,
+            thumbnail_url(obj.image),
         )
 
 
@@ -52,6 +63,14 @@ class CategoryIconAdmin(admin.ModelAdmin):
     list_display_links = ("pk", "avatar_thumbnail", "src")
     ordering = ["pk"]
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("category")
+            .prefetch_related("renditions")
+        )
+
     @admin.display(description="Category Title")
     def category_title(self, obj):
         return obj.category.title if obj.category else None
@@ -61,10 +80,11 @@ class CategoryIconAdmin(admin.ModelAdmin):
         return format_html(
             '<div style="display: flex; align-items: center; justify-content: center;">'
             '   <a href="{0}" target="_blank">'
-            '       <img src="{0}" height="50" style="border-radius: 10%">'
+            '       <img src="{1}" height="50" style="border-radius: 10%">'
             "   </a>"
             "</div>",
             obj.src.url,
+            thumbnail_url(obj),
         )
 
 
@@ -81,12 +101,15 @@ class ProductAdmin(admin.ModelAdmin):
         "pk",
         "title",
         "price",
+        "current_price",
         "category_title",
         "is_active",
         "count",
         "short_description",
         "freeDelivery",
         "limited_edition",
+        "review_count",
+        "rating_avg",
     )
     list_display_links = ("pk", "title")
     ordering = ["pk"]
@@ -111,6 +134,11 @@ class ProductAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return get_search_backend().search(queryset, search_term), False
+
     @admin.display(description="Category")
     def category_title(self, obj):
         return obj.category.title if obj.category else None
@@ -151,6 +179,14 @@ class ProductImageAdmin(admin.ModelAdmin):
     list_display_links = ("pk", "image_thumbnail")
     ordering = ["pk"]
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("product")
+            .prefetch_related("renditions")
+        )
+
     @admin.display(description="Product")
     def product_title(self, obj):
         return obj.product.title if obj.product else None
@@ -161,7 +197,7 @@ class ProductImageAdmin(admin.ModelAdmin):
             '<div style="display: flex; align-items: center; justify-content: center;">'
             '   <img src="{}" style="border-radius: 10%; max-width: 100px; max-height: 50px;">'
             "</div>",
-            obj.src.url,
+            thumbnail_url(obj),
         )
 
 
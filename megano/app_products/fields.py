@@ -0,0 +1,44 @@
+from datetime import datetime, tzinfo
+from functools import lru_cache
+from typing import Any, Optional
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+@lru_cache(maxsize=getattr(settings, "DATETIME_FORMAT_CACHE_SIZE", 4096))
+def format_datetime(
+    value: datetime, field_timezone: Optional[tzinfo], output_format: str
+) -> str:
+    """
+    Formats a timestamp exactly like DateTimeField, memoized. Aware values
+    are converted to `field_timezone` first, so equal instants share an
+    entry whatever timezone they came in.
+    """
+
+    field = serializers.DateTimeField(
+        format=output_format, default_timezone=field_timezone
+    )
+    return field.to_representation(value)
+
+
+class CachedDateTimeField(serializers.DateTimeField):
+    """
+    DateTimeField that formats through a bounded LRU cache, so timestamps
+    rendered again, e.g. in every response of a hot list, skip timezone
+    conversion and strftime.
+    """
+
+    def to_representation(self, value: Any) -> Any:
+        if not value:
+            return None
+
+        output_format = getattr(self, "format", api_settings.DATETIME_FORMAT)
+        if output_format is None or isinstance(value, str):
+            return value
+
+        field_timezone = (
+            self.timezone if hasattr(self, "timezone") else self.default_timezone()
+        )
+        return format_datetime(value, field_timezone, output_format)
@@ -0,0 +1,48 @@
+import hashlib
+from typing import Any, NamedTuple, Optional, Tuple
+
+from .search import get_search_backend
+from .tag_index import tag_index
+
+
+class CatalogFilters(NamedTuple):
+    """Normalized catalog filter set parsed from the query string."""
+
+    name: str = ""
+    min_price: Optional[str] = None
+    max_price: Optional[str] = None
+    free_delivery: bool = False
+    available: bool = False
+    tags: Tuple[str, ...] = ()
+    tags_match_all: bool = False
+
+    @classmethod
+    def from_query_params(cls, params: Any) -> "CatalogFilters":
+        return cls(
+            name=(params.get("filter[name]") or "").strip(),
+            min_price=params.get("filter[minPrice]") or None,
+            max_price=params.get("filter[maxPrice]") or None,
+            free_delivery=params.get("filter[freeDelivery]") == "true",
+            available=params.get("filter[available]") == "true",
+            tags=tuple(sorted(set(params.getlist("tags[]")))),
+            tags_match_all=params.get("tagsMode") == "all",
+        )
+
+    def apply(self, queryset: Any) -> Any:
+        if self.name:
+            queryset = get_search_backend().search(queryset, self.name)
+        if self.min_price:
+            queryset = queryset.filter(current_price__gte=self.min_price)
+        if self.max_price:
+            queryset = queryset.filter(current_price__lte=self.max_price)
+        if self.free_delivery:
+            queryset = queryset.filter(freeDelivery=True)
+        if self.available:
+            queryset = queryset.filter(count__gt=0)
+        if self.tags:
+            queryset = tag_index.filter(queryset, self.tags, self.tags_match_all)
+        return queryset
+
+    def cache_key(self, prefix: str) -> str:
+        digest = hashlib.md5(repr(tuple(self)).encode()).hexdigest()
+        return "{prefix}:{digest}".format(prefix=prefix, digest=digest)
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app_products.review_queue import drain_review_queue
+
+
+class Command(BaseCommand):
+    help = "Publishes queued reviews in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.REVIEW_QUEUE_BATCH_SIZE,
+            help="Reviews published per transaction.",
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep waiting for new reviews instead of exiting when empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            published = drain_review_queue(options["batch_size"])
+            total += published
+            if published:
+                continue
+            if not options["follow"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS("Published {count} reviews.".format(count=total))
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from app_products.models import Product, Review
+
+
+class Command(BaseCommand):
+    help = "Recalculates the stored review count and rating of every product."
+
+    def handle(self, *args, **options):
+        stats = (
+            Review.objects.order_by()
+            .values("product_id")
+            .annotate(count=Count("id"), total=Sum("rate"))
+        )
+
+        with transaction.atomic():
+            Product.objects.update(review_count=0, rating_sum=0, rating_avg=0)
+
+            products = []
+            for row in stats:
+                products.append(
+                    Product(
+                        pk=row["product_id"],
+                        review_count=row["count"],
+                        rating_sum=row["total"],
+                        rating_avg=row["total"] / row["count"],
+                    )
+                )
+            Product.objects.bulk_update(
+                products,
+                ["review_count", "rating_sum", "rating_avg"],
+                batch_size=1000,
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Ratings rebuilt for {count} products.".format(count=len(products))
+            )
+        )
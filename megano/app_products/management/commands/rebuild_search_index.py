@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index of products."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            backend.rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Search index rebuilt with {backend}.".format(
+                    backend=backend.__class__.__name__
+                )
+            )
+        )
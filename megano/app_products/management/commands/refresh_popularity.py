@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from app_products.popularity import rebuild_popularity
+
+
+class Command(BaseCommand):
+    help = "Recalculates the popularity ranking from reviews and order lines."
+
+    def handle(self, *args, **options):
+        count = rebuild_popularity()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Popularity refreshed for {count} products.".format(count=count)
+            )
+        )
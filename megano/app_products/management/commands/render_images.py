@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app_products.models import CategoryIcon, ProductImage
+from app_products.renditions import enqueue_renditions, render_pending
+
+
+class Command(BaseCommand):
+    help = "Generates responsive renditions of queued product images and icons."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Queue every product image and category icon first.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.IMAGE_RENDITION_BATCH_SIZE,
+            help="Images rendered per transaction.",
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep waiting for new images instead of exiting when empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            enqueue_renditions(ProductImage.objects.only("pk"))
+            enqueue_renditions(CategoryIcon.objects.only("pk"))
+
+        total = 0
+        while True:
+            rendered = render_pending(options["batch_size"])
+            total += rendered
+            if rendered:
+                continue
+            if not options["follow"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS("Rendered {count} images.".format(count=total))
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_products.pricing import reprice_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores today's price of every product, starting and ending sales. "
+        "Run it daily, shortly after midnight."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = reprice_products()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Sale prices rolled over for {count} products.".format(count=count)
+            )
+        )
@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_columns(apps, schema_editor):
+    Product = apps.get_model("app_products", "Product")
+    Review = apps.get_model("app_products", "Review")
+
+    stats = (
+        Review.objects.order_by()
+        .values("product_id")
+        .annotate(count=Count("id"), total=Sum("rate"))
+    )
+    for row in stats:
+        Product.objects.filter(pk=row["product_id"]).update(
+            review_count=row["count"],
+            rating_sum=row["total"],
+            rating_avg=row["total"] / row["count"],
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_products", "0007_sale"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_avg",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_columns, migrations.RunPython.noop),
+    ]
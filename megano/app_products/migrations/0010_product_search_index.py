@@ -0,0 +1,53 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+SQLITE_TABLE = "app_products_product_fts"
+POSTGRESQL_TABLE = "app_products_product_search"
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE {table} USING fts5("
+                "title, description, tags, tokenize = 'unicode61 remove_diacritics 2'"
+                ")".format(table=SQLITE_TABLE)
+            )
+        except OperationalError:
+            # SQLite built without FTS5, searches fall back to LIKE
+            return
+    elif connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE {table} ("
+            "product_id bigint PRIMARY KEY "
+            "REFERENCES app_products_product (id) ON DELETE CASCADE "
+            "DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)".format(table=POSTGRESQL_TABLE)
+        )
+        schema_editor.execute(
+            "CREATE INDEX {table}_document_idx ON {table} "
+            "USING GIN (document)".format(table=POSTGRESQL_TABLE)
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS {table}".format(table=SQLITE_TABLE))
+    elif connection.vendor == "postgresql":
+        schema_editor.execute(
+            "DROP TABLE IF EXISTS {table}".format(table=POSTGRESQL_TABLE)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_products", "0009_product_catalog_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-18 17:31
+
+from django.db import migrations, models
+
+
+def fill_category_paths(apps, schema_editor):
+    Category = apps.get_model("app_products", "Category")
+
+    paths = {None: ""}
+    level = list(Category.objects.filter(parent=None))
+    while level:
+        for category in level:
+            category.path = "{prefix}{pk:08d}/".format(
+                prefix=paths[category.parent_id], pk=category.pk
+            )
+            paths[category.pk] = category.path
+        Category.objects.bulk_update(level, ["path"])
+        level = list(Category.objects.filter(parent_id__in=[c.pk for c in level]))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_products", "0010_product_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(fill_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.0 on 2026-10-18 17:36
+
+from datetime import datetime, timezone
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of app_products.popularity as of this migration
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def decay_weight(moment):
+    half_life = getattr(settings, "POPULARITY_HALF_LIFE_DAYS", 30) * 86400
+    return 2 ** ((moment - EPOCH).total_seconds() / half_life)
+
+
+def review_score(date):
+    return getattr(settings, "POPULARITY_REVIEW_WEIGHT", 3.0) * decay_weight(date)
+
+
+def sale_score(date, units):
+    weight = getattr(settings, "POPULARITY_UNIT_WEIGHT", 1.0)
+    return weight * units * decay_weight(date)
+
+
+def fill_popularity(apps, schema_editor):
+    Product = apps.get_model("app_products", "Product")
+    ProductPopularity = apps.get_model("app_products", "ProductPopularity")
+    Review = apps.get_model("app_products", "Review")
+    ProductsInOrder = apps.get_model("app_orders", "ProductsInOrder")
+
+    rows = {
+        pk: ProductPopularity(product_id=pk)
+        for pk in Product.objects.values_list("pk", flat=True)
+    }
+    for product_id, date in Review.objects.values_list("product_id", "date"):
+        rows[product_id].score += review_score(date)
+        rows[product_id].review_count += 1
+    for product_id, date, count in ProductsInOrder.objects.values_list(
+        "product_id", "order__createdAt", "count"
+    ):
+        rows[product_id].score += sale_score(date, count)
+        rows[product_id].units_sold += count
+    ProductPopularity.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_orders", "0002_productsinorder"),
+        ("app_products", "0011_category_path"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductPopularity",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="popularity",
+                        serialize=False,
+                        to="app_products.product",
+                    ),
+                ),
+                ("score", models.FloatField(default=0)),
+                ("review_count", models.PositiveIntegerField(default=0)),
+                ("units_sold", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Product popularity",
+                "verbose_name_plural": "Product popularity",
+                "indexes": [
+                    models.Index(
+                        fields=["-score", "-product"],
+                        name="product_popularity_rank_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0 on 2026-10-18 17:38
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def fill_current_price(apps, schema_editor):
+    Product = apps.get_model("app_products", "Product")
+    Sale = apps.get_model("app_products", "Sale")
+
+    today = timezone.localdate()
+    sale_price = (
+        Sale.objects.filter(
+            Q(dateFrom__isnull=True) | Q(dateFrom__lte=today),
+            Q(dateTo__isnull=True) | Q(dateTo__gte=today),
+            product=OuterRef("pk"),
+        )
+        .order_by("salePrice")
+        .values("salePrice")[:1]
+    )
+    Product.objects.update(current_price=Coalesce(Subquery(sale_price), F("price")))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_products", "0012_product_popularity"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_active_price_idx",
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="current_price",
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=10
+            ),
+        ),
+        migrations.RunPython(fill_current_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["current_price"],
+                name="product_active_cur_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sale",
+            index=models.Index(
+                fields=["dateTo", "dateFrom"], name="sale_active_range_idx"
+            ),
+        ),
+    ]
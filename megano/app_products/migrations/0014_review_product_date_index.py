@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_products", "0013_product_current_price"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "date"], name="review_product_date_idx"
+            ),
+        ),
+    ]
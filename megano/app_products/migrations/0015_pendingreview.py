@@ -0,0 +1,45 @@
+# Generated by Django 5.0 on 2026-10-18 17:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_products", "0014_review_product_date_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingReview",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("author", models.CharField(default="Anonymous", max_length=128)),
+                ("email", models.EmailField(max_length=254)),
+                ("text", models.TextField()),
+                ("rate", models.IntegerField()),
+                ("queued_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_reviews",
+                        to="app_products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Pending review",
+                "verbose_name_plural": "Pending reviews",
+                "ordering": ["pk"],
+            },
+        ),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 5.0 on 2026-10-18 17:50
+
+import app_products.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_products", "0015_pendingreview"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryIconRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "src",
+                    models.ImageField(
+                        max_length=255,
+                        upload_to=app_products.models.rendition_directory_path,
+                    ),
+                ),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                ("format", models.CharField(max_length=8)),
+                (
+                    "icon",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="app_products.categoryicon",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Category icon rendition",
+                "verbose_name_plural": "Category icon renditions",
+                "ordering": ["format", "width"],
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="PendingRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("queued_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Pending rendition",
+                "verbose_name_plural": "Pending renditions",
+                "ordering": ["pk"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductImageRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "src",
+                    models.ImageField(
+                        max_length=255,
+                        upload_to=app_products.models.rendition_directory_path,
+                    ),
+                ),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                ("format", models.CharField(max_length=8)),
+                (
+                    "image",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="app_products.productimage",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Product image rendition",
+                "verbose_name_plural": "Product image renditions",
+                "ordering": ["format", "width"],
+                "abstract": False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="categoryiconrendition",
+            constraint=models.UniqueConstraint(
+                fields=("icon", "format", "width"),
+                name="category_icon_rendition_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="pendingrendition",
+            constraint=models.UniqueConstraint(
+                fields=("content_type", "object_id"), name="pending_rendition_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="productimagerendition",
+            constraint=models.UniqueConstraint(
+                fields=("image", "format", "width"),
+                name="product_image_rendition_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-18 18:21
+
+import app_products.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_products", "0016_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="categoryicon",
+            name="src",
+            field=models.ImageField(
+                max_length=255,
+                upload_to=app_products.models.category_image_directory_path,
+                verbose_name="Category link",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="productimage",
+            name="src",
+            field=models.ImageField(
+                max_length=255,
+                upload_to=app_products.models.product_image_directory_path,
+                verbose_name="Image link",
+            ),
+        ),
+    ]
@@ -1,4 +1,15 @@
+import os
+from datetime import date
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Concat, Substr
+from django.utils import timezone
 
 
 def category_image_directory_path(instance: "CategoryIcon", filename: str) -> str:
@@ -22,6 +33,15 @@ def product_image_directory_path(instance: "ProductImage", filename: str) -> str
     )
 
 
+def rendition_directory_path(instance: "ImageRendition", filename: str) -> str:
+    """Places renditions next to a mirror of their original's path."""
+
+    return "renditions/{directory}/{filename}".format(
+        directory=os.path.dirname(instance.original.name),
+        filename=filename,
+    )
+
+
 class Category(models.Model):
     """Represents a category in the system."""
 
@@ -36,6 +56,7 @@ class Category(models.Model):
         db_index=True,
     )
     favourite = models.BooleanField(default=False)
+    path = models.CharField(max_length=255, default="", db_index=True, editable=False)
 
     class Meta:
         verbose_name = "Category"
@@ -45,10 +66,47 @@ class Category(models.Model):
     def __str__(self):
         return "{title}".format(title=self.title)
 
+    def build_path(self) -> str:
+        """
+        Returns the materialized path: the zero-padded pks of the ancestors
+        and of the category itself, so ordering by path walks the tree.
+        """
+
+        prefix = self.parent.path if self.parent else ""
+        return "{prefix}{pk:08d}/".format(prefix=prefix, pk=self.pk)
+
+    def is_nested_in_itself(self) -> bool:
+        return bool(
+            self.path and self.parent and self.parent.path.startswith(self.path)
+        )
+
+    def clean(self):
+        if self.is_nested_in_itself():
+            raise ValidationError({"parent": "A category cannot be nested in itself."})
+
+    def save(self, *args, **kwargs):
+        if self.is_nested_in_itself():
+            raise ValueError("A category cannot be nested in itself.")
+        super().save(*args, **kwargs)
+
+        old_path, new_path = self.path, self.build_path()
+        if old_path == new_path:
+            return
+
+        Category.objects.filter(pk=self.pk).update(path=new_path)
+        if old_path:
+            # Move the whole subtree along with the category
+            Category.objects.filter(path__startswith=old_path).exclude(
+                pk=self.pk
+            ).update(path=Concat(Value(new_path), Substr("path", len(old_path) + 1)))
+        self.path = new_path
+
 
 class CategoryIcon(models.Model):
     src = models.ImageField(
-        upload_to=category_image_directory_path, verbose_name="Category link"
+        upload_to=category_image_directory_path,
+        max_length=255,
+        verbose_name="Category link",
     )
     alt = models.CharField(
         max_length=128,
@@ -77,6 +135,29 @@ class Tag(models.Model):
         return "{name}".format(name=self.name)
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_details(self) -> "ProductQuerySet":
+        """
+        Prefetches everything the product detail serializer reads: the
+        latest reviews only, and specification values joined to their names.
+        """
+
+        latest_reviews = Review.objects.order_by("-date", "-id")[
+            : settings.PRODUCT_DETAIL_REVIEWS
+        ]
+        return self.prefetch_related(
+            "images__renditions",
+            "tags",
+            models.Prefetch(
+                "reviews", queryset=latest_reviews, to_attr="latest_reviews"
+            ),
+            models.Prefetch(
+                "product_values",
+                queryset=SpecificationValue.objects.select_related("specification"),
+            ),
+        )
+
+
 class Product(models.Model):
     """Represents a product in the system."""
 
@@ -85,6 +166,9 @@ class Product(models.Model):
     )
     title = models.CharField(max_length=128, null=False, blank=False)
     price = models.DecimalField(default=0, max_digits=10, decimal_places=2)
+    current_price = models.DecimalField(
+        default=0, max_digits=10, decimal_places=2, editable=False
+    )
     count = models.PositiveIntegerField(default=0)
     date = models.DateTimeField(auto_now_add=True)
     description = models.TextField(max_length=256, null=True, blank=True)
@@ -92,6 +176,9 @@ class Product(models.Model):
     freeDelivery = models.BooleanField(default=True)
     limited_edition = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    rating_avg = models.FloatField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
     tags = models.ManyToManyField(Tag, related_name="product_tags")
     specifications = models.ManyToManyField(
         "Specification",
@@ -99,14 +186,60 @@ class Product(models.Model):
         related_name="product_specifications",
     )
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
         ordering = ["pk"]
+        indexes = [
+            models.Index(
+                fields=["date"],
+                condition=Q(is_active=True),
+                name="product_active_date_idx",
+            ),
+            models.Index(
+                fields=["current_price"],
+                condition=Q(is_active=True),
+                name="product_active_cur_price_idx",
+            ),
+            models.Index(
+                fields=["review_count"],
+                condition=Q(is_active=True),
+                name="product_active_reviews_idx",
+            ),
+            models.Index(
+                fields=["rating_avg"],
+                condition=Q(is_active=True),
+                name="product_active_rating_idx",
+            ),
+            models.Index(
+                fields=["category", "is_active"],
+                name="product_category_active_idx",
+            ),
+        ]
 
     def __str__(self):
         return "{title}".format(title=self.title)
 
+    @classmethod
+    def shift_rating(cls, product_id: int, count_delta: int, sum_delta: int) -> None:
+        """
+        Adds the deltas to the stored review count and rating sum of a product
+        and recomputes the average in a single UPDATE.
+        """
+
+        cls.objects.filter(pk=product_id).update(
+            review_count=F("review_count") + count_delta,
+            rating_sum=F("rating_sum") + sum_delta,
+            rating_avg=Case(
+                When(review_count__lte=-count_delta, then=Value(0.0)),
+                default=Cast(F("rating_sum") + sum_delta, FloatField())
+                / (F("review_count") + count_delta),
+                output_field=FloatField(),
+            ),
+        )
+
 
 class Specification(models.Model):
     """Represents a specification in the system."""
@@ -141,7 +274,9 @@ class ProductImage(models.Model):
         Product, on_delete=models.CASCADE, related_name="images"
     )
     src = models.ImageField(
-        upload_to=product_image_directory_path, verbose_name="Image link"
+        upload_to=product_image_directory_path,
+        max_length=255,
+        verbose_name="Image link",
     )
     alt = models.CharField(
         max_length=128, verbose_name="Image description", default="Image description"
@@ -176,6 +311,9 @@ class Review(models.Model):
         verbose_name = "Review"
         verbose_name_plural = "Reviews"
         ordering = ["pk"]
+        indexes = [
+            models.Index(fields=["product", "date"], name="review_product_date_idx"),
+        ]
 
     def __str__(self):
         """
@@ -185,6 +323,41 @@ class Review(models.Model):
         return "{author}".format(author=self.author)
 
 
+class PendingReview(models.Model):
+    """
+    A validated review waiting in the ingestion queue to be published by
+    the `drain_review_queue` command.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="pending_reviews"
+    )
+    author = models.CharField(max_length=128, default="Anonymous")
+    email = models.EmailField()
+    text = models.TextField()
+    rate = models.IntegerField()
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Pending review"
+        verbose_name_plural = "Pending reviews"
+        ordering = ["pk"]
+
+    def __str__(self):
+        return "{author}".format(author=self.author)
+
+
+class SaleQuerySet(models.QuerySet):
+    def active(self, on: Optional[date] = None) -> "SaleQuerySet":
+        """Sales running on the given day, today by default."""
+
+        on = on or timezone.localdate()
+        return self.filter(
+            Q(dateFrom__isnull=True) | Q(dateFrom__lte=on),
+            Q(dateTo__isnull=True) | Q(dateTo__gte=on),
+        )
+
+
 class Sale(models.Model):
     """Represents a sale for a product."""
 
@@ -193,12 +366,154 @@ class Sale(models.Model):
     dateFrom = models.DateField(blank=True, null=True)
     dateTo = models.DateField(blank=True, null=True)
 
+    objects = SaleQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Sale"
         verbose_name_plural = "Sales"
+        indexes = [
+            models.Index(fields=["dateTo", "dateFrom"], name="sale_active_range_idx"),
+        ]
 
     def __str__(self):
         """
         Returns a string representation of the sale, using the product title.
         """
         return "{title}".format(title=self.product.title)
+
+
+class ProductPopularity(models.Model):
+    """
+    Stores the popularity score of a product, blended from its reviews and
+    units sold with time decay. See `app_products.popularity`.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="popularity",
+    )
+    score = models.FloatField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Product popularity"
+        verbose_name_plural = "Product popularity"
+        indexes = [
+            models.Index(
+                fields=["-score", "-product"], name="product_popularity_rank_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return "{product}: {score}".format(product=self.product_id, score=self.score)
+
+    @classmethod
+    def shift(
+        cls,
+        product_id: int,
+        score_delta: float,
+        reviews_delta: int = 0,
+        units_delta: int = 0,
+    ) -> int:
+        """
+        Adds the deltas to the stored popularity of a product in a single
+        UPDATE and returns the number of rows changed.
+        """
+
+        return cls.objects.filter(product_id=product_id).update(
+            score=F("score") + score_delta,
+            review_count=F("review_count") + reviews_delta,
+            units_sold=F("units_sold") + units_delta,
+        )
+
+
+class ImageRendition(models.Model):
+    """
+    A resized copy of an uploaded image in a web format. Subclasses name
+    their foreign key to the original image in `original_field`.
+    """
+
+    original_field: str
+
+    src = models.ImageField(upload_to=rendition_directory_path, max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    format = models.CharField(max_length=8)
+
+    class Meta:
+        abstract = True
+        ordering = ["format", "width"]
+
+    def __str__(self):
+        return "{name}".format(name=self.src.name)
+
+    @property
+    def original(self):
+        """The uploaded file this is a rendition of."""
+
+        return getattr(self, self.original_field).src
+
+
+class ProductImageRendition(ImageRendition):
+    original_field = "image"
+
+    image = models.ForeignKey(
+        ProductImage, on_delete=models.CASCADE, related_name="renditions"
+    )
+
+    class Meta(ImageRendition.Meta):
+        verbose_name = "Product image rendition"
+        verbose_name_plural = "Product image renditions"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["image", "format", "width"],
+                name="product_image_rendition_unique",
+            ),
+        ]
+
+
+class CategoryIconRendition(ImageRendition):
+    original_field = "icon"
+
+    icon = models.ForeignKey(
+        CategoryIcon, on_delete=models.CASCADE, related_name="renditions"
+    )
+
+    class Meta(ImageRendition.Meta):
+        verbose_name = "Category icon rendition"
+        verbose_name_plural = "Category icon renditions"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["icon", "format", "width"],
+                name="category_icon_rendition_unique",
+            ),
+        ]
+
+
+class PendingRendition(models.Model):
+    """
+    A product image or category icon waiting for the `render_images`
+    command to generate its renditions.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    image = GenericForeignKey("content_type", "object_id")
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Pending rendition"
+        verbose_name_plural = "Pending renditions"
+        ordering = ["pk"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id"],
+                name="pending_rendition_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return "{type} {id}".format(type=self.content_type, id=self.object_id)
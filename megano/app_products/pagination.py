@@ -0,0 +1,198 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+
+def cursor_requested(request: Request) -> bool:
+    """Checks whether the client opted in to cursor pagination."""
+
+    params = request.query_params
+    return params.get("pagination") == "cursor" or "cursor" in params
+
+
+def estimate_count(queryset: Any) -> Optional[int]:
+    """
+    Returns the row estimate of the database planner for a queryset, or
+    None when the database does not expose one.
+    """
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that keeps the result count in the cache under `count_key`.
+
+    When `CATALOG_COUNT_ESTIMATE_THRESHOLD` is set and the planner estimates
+    at least that many rows, the estimate is used instead of `COUNT(*)`.
+    """
+
+    def __init__(self, *args: Any, count_key: Optional[str] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self) -> int:
+        if self.count_key is None:
+            return super().count
+
+        count = cache.get(self.count_key)
+        if count is None:
+            threshold = getattr(settings, "CATALOG_COUNT_ESTIMATE_THRESHOLD", None)
+            if threshold is not None:
+                count = estimate_count(self.object_list)
+                if count is not None and count < threshold:
+                    count = None
+            if count is None:
+                count = super().count
+            cache.set(
+                self.count_key,
+                count,
+                getattr(settings, "CATALOG_COUNT_CACHE_TIMEOUT", 60),
+            )
+        return count
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the leading ordering column of the queryset
+    plus `id`, so every page is a `WHERE (column, id) > cursor LIMIT n`
+    query instead of an OFFSET scan.
+
+    The queryset must be ordered by `column, id` in the same direction,
+    e.g. `order_by("-price", "-id")`. Pages of `values()` rows must include
+    both columns.
+    """
+
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(
+        self, queryset: Any, request: Request, view: Any = None
+    ) -> List[Any]:
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.annotations = queryset.query.annotations
+        self.field, self.descending = self.get_ordering(queryset)
+
+        position = self.decode_cursor(request)
+        reverse = False
+        if position is not None:
+            value, pk, reverse = position
+            queryset = queryset.filter(self.keyset_filter(value, pk, reverse))
+        if reverse:
+            queryset = queryset.reverse()
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_prev = position is not None and (has_more if reverse else True)
+        self.page = results
+        return results
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset: Any) -> Tuple[str, bool]:
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        field = ordering[0] if ordering else "id"
+        descending = field.startswith("-")
+        field = field.lstrip("-")
+        return ("id" if field == "pk" else field), descending
+
+    def get_field(self, name: str) -> Any:
+        """Returns the model field or annotation the queryset is ordered by."""
+
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return self.annotations[name].output_field
+
+    def keyset_filter(self, value: Any, pk: int, reverse: bool) -> Q:
+        lookup = "lt" if self.descending != reverse else "gt"
+        if self.field == "id":
+            return Q(**{"id__" + lookup: pk})
+        return Q(**{"{0}__{1}".format(self.field, lookup): value}) | Q(
+            **{self.field: value, "id__" + lookup: pk}
+        )
+
+    def encode_cursor(self, obj: Any, reverse: bool) -> str:
+        if isinstance(obj, dict):
+            value, pk = obj[self.field], obj["id"]
+        else:
+            value, pk = getattr(obj, self.field), obj.pk
+        if not isinstance(value, (int, float)):
+            value = None if value is None else str(value)
+        payload = {"v": value, "id": pk}
+        if reverse:
+            payload["r"] = 1
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request: Request) -> Optional[Tuple[Any, int, bool]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw = urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            payload = json.loads(raw)
+            pk = int(payload["id"])
+            value = payload["v"]
+            if self.field != "id":
+                value = self.get_field(self.field).to_python(value)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, bool(payload.get("r"))
+
+    def get_next_cursor(self) -> Optional[str]:
+        if not self.page or not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_cursor(self) -> Optional[str]:
+        if not self.page or not self.has_prev:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response(
+            {
+                "items": data,
+                "next": self.get_next_cursor(),
+                "prev": self.get_previous_cursor(),
+            }
+        )
@@ -0,0 +1,137 @@
+"""
+Popularity ranking of products.
+
+Every review and every unit sold adds a weight that halves each
+`POPULARITY_HALF_LIFE_DAYS`. Instead of decaying stored scores over time,
+new events are weighted up relative to a fixed epoch (forward decay): the
+relative order of scores is the same as with decayed ones, so an event
+changes a single row and stored scores never need to be aged.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+
+from .cache import bump_generation_on_commit
+from .models import Product, ProductPopularity, Review
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+GENERATION = "productpopularity"
+
+
+def decay_weight(moment: datetime) -> float:
+    """Returns the forward-decayed weight of an event at `moment`."""
+
+    half_life = getattr(settings, "POPULARITY_HALF_LIFE_DAYS", 30) * 86400
+    return 2 ** ((moment - EPOCH).total_seconds() / half_life)
+
+
+def review_score(date: datetime) -> float:
+    return getattr(settings, "POPULARITY_REVIEW_WEIGHT", 3.0) * decay_weight(date)
+
+
+def sale_score(date: datetime, units: int) -> float:
+    weight = getattr(settings, "POPULARITY_UNIT_WEIGHT", 1.0)
+    return weight * units * decay_weight(date)
+
+
+def shift_popularity(
+    product_id: int, score_delta: float, reviews_delta: int = 0, units_delta: int = 0
+) -> None:
+    """
+    Applies an event to the stored popularity of a product. Products
+    without a row yet are left to `refresh_popularity`.
+    """
+
+    if ProductPopularity.shift(product_id, score_delta, reviews_delta, units_delta):
+        bump_generation_on_commit(GENERATION)
+
+
+def record_review(review: Review, sign: int = 1) -> None:
+    shift_popularity(review.product_id, sign * review_score(review.date), sign)
+
+
+def record_sale(product_id: int, date: datetime, units: int, sign: int = 1) -> None:
+    shift_popularity(
+        product_id, sign * sale_score(date, units), units_delta=sign * units
+    )
+
+
+def record_sales(date: datetime, units: Dict[int, int]) -> None:
+    """
+    Records the units sold ({product id: units}, negative to take them
+    back) of several products at once, in a single UPDATE.
+    """
+
+    if not units:
+        return
+    scores = Case(
+        *[
+            When(product_id=product_id, then=Value(sale_score(date, count)))
+            for product_id, count in units.items()
+        ],
+        output_field=models.FloatField(),
+    )
+    counts = Case(
+        *[
+            When(product_id=product_id, then=Value(count))
+            for product_id, count in units.items()
+        ],
+        output_field=models.IntegerField(),
+    )
+    changed = ProductPopularity.objects.filter(product_id__in=units).update(
+        score=F("score") + scores, units_sold=F("units_sold") + counts
+    )
+    if changed:
+        bump_generation_on_commit(GENERATION)
+
+
+def rebuild_popularity(product_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recomputes the popularity of the given products, or of all of them, from
+    reviews and order lines. Returns the number of products stored.
+    """
+
+    ProductsInOrder = apps.get_model("app_orders", "ProductsInOrder")
+
+    products = Product.objects.all()
+    reviews = Review.objects.order_by()
+    sales = ProductsInOrder.objects.order_by()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        products = products.filter(pk__in=product_ids)
+        reviews = reviews.filter(product_id__in=product_ids)
+        sales = sales.filter(product_id__in=product_ids)
+
+    rows: Dict[int, ProductPopularity] = {
+        pk: ProductPopularity(product_id=pk)
+        for pk in products.values_list("pk", flat=True).iterator(chunk_size=10000)
+    }
+    for product_id, date in reviews.values_list("product_id", "date").iterator(
+        chunk_size=10000
+    ):
+        row = rows[product_id]
+        row.score += review_score(date)
+        row.review_count += 1
+
+    for product_id, date, count in sales.values_list(
+        "product_id", "order__createdAt", "count"
+    ).iterator(chunk_size=10000):
+        row = rows[product_id]
+        row.score += sale_score(date, count)
+        row.units_sold += count
+
+    with transaction.atomic():
+        ProductPopularity.objects.bulk_create(
+            rows.values(),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["score", "review_count", "units_sold"],
+        )
+    bump_generation_on_commit(GENERATION)
+    return len(rows)
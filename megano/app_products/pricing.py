@@ -0,0 +1,79 @@
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .cache import bump_generation_on_commit
+from .models import Product, Sale
+
+CENT = Decimal("0.01")
+
+
+def effective_price(on: Optional[date] = None) -> Coalesce:
+    """
+    Expression for the price a product sells at on the given day: the
+    lowest active sale price, or the regular price.
+    """
+
+    sale_price = (
+        Sale.objects.active(on)
+        .filter(product=OuterRef("pk"))
+        .order_by("salePrice")
+        .values("salePrice")[:1]
+    )
+    return Coalesce(
+        Subquery(sale_price), "price", output_field=Product._meta.get_field("price")
+    )
+
+
+def current_prices(
+    product_ids: Iterable[int], on: Optional[date] = None
+) -> Dict[int, Decimal]:
+    """Resolves the current price of many products in one query."""
+
+    prices = (
+        Product.objects.filter(pk__in=list(product_ids))
+        .annotate(resolved_price=effective_price(on))
+        .values_list("pk", "resolved_price")
+    )
+    return {pk: price.quantize(CENT) for pk, price in prices}
+
+
+def resolve_price(product: Product, on: Optional[date] = None) -> Decimal:
+    """Resolves the current price of a product from its unsaved state."""
+
+    if product.pk is None:
+        return product.price
+    sale_price = (
+        Sale.objects.active(on)
+        .filter(product_id=product.pk)
+        .order_by("salePrice")
+        .values_list("salePrice", flat=True)
+        .first()
+    )
+    return product.price if sale_price is None else sale_price
+
+
+def reprice_products(
+    product_ids: Optional[Iterable[int]] = None, on: Optional[date] = None
+) -> int:
+    """
+    Stores the current price of the given products, or of all of them, in
+    `Product.current_price`. Returns the number of products repriced.
+    """
+
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=list(product_ids))
+
+    changed = list(
+        products.annotate(resolved_price=effective_price(on))
+        .exclude(current_price=F("resolved_price"))
+        .values_list("pk", flat=True)
+    )
+    if changed:
+        Product.objects.filter(pk__in=changed).update(current_price=effective_price(on))
+        bump_generation_on_commit("product")
+    return len(changed)
@@ -0,0 +1,258 @@
+"""
+Responsive renditions of product images and category icons.
+
+Saving an image queues it as a `PendingRendition`. The `render_images`
+command resizes queued originals to every width of IMAGE_RENDITION_WIDTHS
+in every format of IMAGE_RENDITION_FORMATS, off the request path, and
+serializers expose the results as a `srcset` per MIME type.
+"""
+
+import logging
+import os
+from collections import defaultdict
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
+
+from megano.storage import media_url, resolve_url
+
+from .cache import bump_generation
+from .models import (
+    CategoryIcon,
+    CategoryIconRendition,
+    ImageRendition,
+    PendingRendition,
+    ProductImage,
+    ProductImageRendition,
+)
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+SAVE_OPTIONS = {
+    "webp": {"method": 4},
+    "jpeg": {"optimize": True, "progressive": True},
+}
+
+# Rendition model per original model
+RENDITION_MODELS: Dict[Type[models.Model], Type[ImageRendition]] = {
+    ProductImage: ProductImageRendition,
+    CategoryIcon: CategoryIconRendition,
+}
+
+
+def enqueue_renditions(images: Iterable[models.Model]) -> None:
+    """Queues product images or category icons for rendering."""
+
+    PendingRendition.objects.bulk_create(
+        [
+            PendingRendition(
+                content_type=ContentType.objects.get_for_model(image),
+                object_id=image.pk,
+            )
+            for image in images
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def build_srcset(
+    renditions: Iterable[Tuple[str, int, str]], storage: Storage
+) -> Dict[str, str]:
+    """
+    Builds `{mime type: srcset}` from renditions given as (format, width,
+    name) ordered by format and width.
+    """
+
+    candidates = defaultdict(list)
+    for image_format, width, name in renditions:
+        candidates[MIME_TYPES[image_format]].append(
+            "{url} {width}w".format(url=resolve_url(storage, name), width=width)
+        )
+    return {mime_type: ", ".join(urls) for mime_type, urls in candidates.items()}
+
+
+def get_srcset(image: models.Model) -> Dict[str, str]:
+    """`srcset` of an image whose `renditions` are prefetched."""
+
+    rendition_model = RENDITION_MODELS[type(image)]
+    return build_srcset(
+        (
+            (rendition.format, rendition.width, rendition.src.name)
+            for rendition in image.renditions.all()
+        ),
+        rendition_model._meta.get_field("src").storage,
+    )
+
+
+def thumbnail_url(image: models.Model, width: int = 160) -> str:
+    """
+    URL of the smallest rendition at least `width` pixels wide in the
+    preferred format, or of the original when there is none.
+    """
+
+    preferred = settings.IMAGE_RENDITION_FORMATS[0]
+    candidates = [
+        rendition
+        for rendition in image.renditions.all()
+        if rendition.format == preferred and rendition.width >= width
+    ]
+    if not candidates:
+        return media_url(image.src)
+    return media_url(min(candidates, key=lambda rendition: rendition.width).src)
+
+
+def open_original(file: FieldFile) -> Image.Image:
+    with file.open("rb"), Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def encode(image: Image.Image, image_format: str) -> bytes:
+    if image_format == "jpeg" and image.mode == "RGBA":
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        format=image_format,
+        quality=settings.IMAGE_RENDITION_QUALITY,
+        **SAVE_OPTIONS.get(image_format, {})
+    )
+    return buffer.getvalue()
+
+
+def render_image(file: FieldFile) -> List[Tuple[str, int, int, ContentFile]]:
+    """
+    Resizes an original to the configured widths below its own, or keeps
+    its width when it is narrower than all of them, and encodes every size
+    in every format. Returns (format, width, height, content) tuples.
+    """
+
+    original = open_original(file)
+    widths = [
+        width for width in settings.IMAGE_RENDITION_WIDTHS if width < original.width
+    ] or [original.width]
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+
+    renditions = []
+    for width in widths:
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.Resampling.LANCZOS)
+        for image_format in settings.IMAGE_RENDITION_FORMATS:
+            name = "{stem}_{width}w.{ext}".format(
+                stem=stem, width=width, ext=EXTENSIONS[image_format]
+            )
+            content = ContentFile(encode(resized, image_format), name=name)
+            renditions.append((image_format, width, height, content))
+    return renditions
+
+
+def render_renditions(image: models.Model) -> List[ImageRendition]:
+    """
+    Renders a product image or category icon and stores the files of its
+    new renditions, returned unsaved. Originals that cannot be read as
+    images, e.g. SVG icons, get none.
+    """
+
+    rendition_model = RENDITION_MODELS[type(image)]
+    field = rendition_model.original_field
+    try:
+        rendered = render_image(image.src)
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        logger.warning("Cannot render %s: %s", image.src.name, error)
+        rendered = []
+
+    renditions = []
+    for image_format, width, height, content in rendered:
+        rendition = rendition_model(
+            width=width, height=height, format=image_format, **{field: image}
+        )
+        rendition.src.save(content.name, content, save=False)
+        renditions.append(rendition)
+    return renditions
+
+
+def delete_files(storage: Storage, names: Iterable[str]) -> None:
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+def replace_renditions(
+    item: PendingRendition,
+    image: Optional[models.Model],
+    renditions: List[ImageRendition],
+) -> bool:
+    """
+    Swaps the renditions of a queued image for `renditions` and dequeues
+    it, unless another worker dequeued it or its original was replaced in
+    the meantime. Files of the old renditions are deleted once it commits.
+    """
+
+    with transaction.atomic():
+        claimed = PendingRendition.objects.select_for_update(skip_locked=True).filter(
+            pk=item.pk
+        )
+        if not claimed.exists():
+            return False
+        if image is not None:
+            if not type(image).objects.filter(pk=image.pk, src=image.src.name).exists():
+                # Stays queued, the next run renders the new original
+                return False
+            rendition_model = RENDITION_MODELS[type(image)]
+            replaced = rendition_model.objects.filter(
+                **{rendition_model.original_field: image}
+            )
+            stale = list(replaced.values_list("src", flat=True))
+            replaced.delete()
+            rendition_model.objects.bulk_create(renditions)
+            storage = rendition_model._meta.get_field("src").storage
+            transaction.on_commit(lambda: delete_files(storage, stale))
+        claimed.delete()
+    return True
+
+
+def render_pending(batch_size: int) -> int:
+    """
+    Renders up to `batch_size` queued images, oldest first, and returns how
+    many were processed. Images are encoded outside of any transaction and
+    swapped in by a short one each; when concurrent workers render the same
+    image, the first to finish keeps its renditions.
+    """
+
+    pending: List[PendingRendition] = list(PendingRendition.objects.all()[:batch_size])
+    if not pending:
+        return 0
+
+    items = defaultdict(list)
+    for item in pending:
+        items[item.content_type_id].append(item)
+    for content_type_id, queued in items.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        images = model.objects.in_bulk([item.object_id for item in queued])
+        for item in queued:
+            image = images.get(item.object_id)
+            renditions = [] if image is None else render_renditions(image)
+            if not replace_renditions(item, image, renditions):
+                delete_files(
+                    RENDITION_MODELS[model]._meta.get_field("src").storage,
+                    [rendition.src.name for rendition in renditions],
+                )
+        # Cached responses embed renditions of these images
+        bump_generation(model._meta.model_name)
+
+    return len(pending)
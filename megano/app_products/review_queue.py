@@ -0,0 +1,63 @@
+"""
+Write-behind ingestion of reviews.
+
+With `REVIEW_QUEUE_ENABLED`, posted reviews are validated and stored as
+`PendingReview` rows, which touches neither the review table nor the
+product row. `drain_review_queue` publishes them in batches: one bulk
+insert of reviews and one rating and popularity update per product.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from django.db import transaction
+
+from .cache import bump_generation
+from .models import PendingReview, Product, Review
+from .popularity import review_score, shift_popularity
+
+
+def enqueue_review(product_id: int, data: Dict[str, Any]) -> PendingReview:
+    return PendingReview.objects.create(product_id=product_id, **data)
+
+
+def drain_review_queue(batch_size: int) -> int:
+    """
+    Publishes up to `batch_size` queued reviews, oldest first, and returns
+    how many were published. Concurrent workers skip each other's rows on
+    databases that support `SKIP LOCKED`.
+    """
+
+    with transaction.atomic():
+        pending: List[PendingReview] = list(
+            PendingReview.objects.select_for_update(skip_locked=True)[:batch_size]
+        )
+        if not pending:
+            return 0
+
+        reviews = Review.objects.bulk_create(
+            Review(
+                product_id=item.product_id,
+                author=item.author,
+                email=item.email,
+                text=item.text,
+                rate=item.rate,
+            )
+            for item in pending
+        )
+
+        counts = defaultdict(int)
+        rates = defaultdict(int)
+        scores = defaultdict(float)
+        for review in reviews:
+            counts[review.product_id] += 1
+            rates[review.product_id] += review.rate
+            scores[review.product_id] += review_score(review.date)
+        for product_id, count in counts.items():
+            Product.shift_rating(product_id, count, rates[product_id])
+            shift_popularity(product_id, scores[product_id], count)
+
+        PendingReview.objects.filter(pk__in=[item.pk for item in pending]).delete()
+
+    bump_generation("review")
+    return len(pending)
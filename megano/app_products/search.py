@@ -0,0 +1,258 @@
+import re
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Product, Tag
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(query: str) -> List[str]:
+    """Splits a search query into lower-cased words."""
+
+    return WORD_RE.findall(query.lower())
+
+
+class LikeSearchBackend:
+    """
+    Fallback backend that matches product titles with `icontains`.
+    Needs no index, so `index`, `remove` and `rebuild` do nothing.
+    """
+
+    def search(self, queryset: Any, query: str) -> Any:
+        return queryset.filter(title__icontains=query)
+
+    def rank(self, queryset: Any, query: str) -> Any:
+        """Annotates `search_rank`, where lower values are better matches."""
+
+        return self.search(queryset, query).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    def index(self, product_ids: Iterable[int]) -> None:
+        pass
+
+    def remove(self, product_ids: Iterable[int]) -> None:
+        pass
+
+    def rebuild(self) -> None:
+        pass
+
+
+class SQLiteSearchBackend(LikeSearchBackend):
+    """
+    Searches an FTS5 table holding the title, description and tag names
+    of every product, with the product id as rowid.
+    """
+
+    table = "app_products_product_fts"
+    # bm25 column weights for title, description and tags
+    weights = "10.0, 1.0, 5.0"
+
+    def match_expression(self, query: str) -> Optional[str]:
+        terms = search_terms(query)
+        if not terms:
+            return None
+        return " ".join('"{term}"*'.format(term=term) for term in terms)
+
+    def search(self, queryset: Any, query: str) -> Any:
+        match = self.match_expression(query)
+        if match is None:
+            return queryset
+        return queryset.filter(
+            id__in=RawSQL(
+                "SELECT rowid FROM {table} WHERE {table} MATCH %s".format(
+                    table=self.table
+                ),
+                [match],
+            )
+        )
+
+    def rank(self, queryset: Any, query: str) -> Any:
+        match = self.match_expression(query)
+        if match is None:
+            return super().rank(queryset, query)
+        return self.search(queryset, query).annotate(
+            search_rank=RawSQL(
+                "SELECT bm25({table}, {weights}) FROM {table} "
+                "WHERE {table} MATCH %s AND rowid = {product}.id".format(
+                    table=self.table,
+                    weights=self.weights,
+                    product=Product._meta.db_table,
+                ),
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+    def document_sql(self) -> str:
+        return (
+            "SELECT p.id, p.title, COALESCE(p.description, ''), "
+            "COALESCE((SELECT group_concat(t.name, ' ') FROM {through} pt "
+            "JOIN {tag} t ON t.id = pt.tag_id WHERE pt.product_id = p.id), '') "
+            "FROM {product} p".format(
+                through=Product.tags.through._meta.db_table,
+                tag=Tag._meta.db_table,
+                product=Product._meta.db_table,
+            )
+        )
+
+    def index(self, product_ids: Iterable[int]) -> None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {table} WHERE rowid IN ({ids})".format(
+                    table=self.table, ids=placeholders
+                ),
+                product_ids,
+            )
+            cursor.execute(
+                "INSERT INTO {table} (rowid, title, description, tags) "
+                "{documents} WHERE p.id IN ({ids})".format(
+                    table=self.table, documents=self.document_sql(), ids=placeholders
+                ),
+                product_ids,
+            )
+
+    def remove(self, product_ids: Iterable[int]) -> None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {table} WHERE rowid IN ({ids})".format(
+                    table=self.table, ids=", ".join(["%s"] * len(product_ids))
+                ),
+                product_ids,
+            )
+
+    def rebuild(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM {table}".format(table=self.table))
+            cursor.execute(
+                "INSERT INTO {table} (rowid, title, description, tags) "
+                "{documents}".format(table=self.table, documents=self.document_sql())
+            )
+
+
+class PostgreSQLSearchBackend(LikeSearchBackend):
+    """
+    Searches a side table with one weighted tsvector per product, indexed
+    with GIN.
+    """
+
+    table = "app_products_product_search"
+
+    def tsquery(self, query: str) -> Optional[str]:
+        terms = search_terms(query)
+        if not terms:
+            return None
+        return " & ".join("{term}:*".format(term=term) for term in terms)
+
+    def search(self, queryset: Any, query: str) -> Any:
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return queryset
+        return queryset.filter(
+            id__in=RawSQL(
+                "SELECT product_id FROM {table} "
+                "WHERE document @@ to_tsquery('simple', %s)".format(table=self.table),
+                [tsquery],
+            )
+        )
+
+    def rank(self, queryset: Any, query: str) -> Any:
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return super().rank(queryset, query)
+        return self.search(queryset, query).annotate(
+            search_rank=RawSQL(
+                "SELECT -ts_rank(document, to_tsquery('simple', %s)) "
+                "FROM {table} WHERE product_id = {product}.id".format(
+                    table=self.table, product=Product._meta.db_table
+                ),
+                [tsquery],
+                output_field=FloatField(),
+            )
+        )
+
+    def document_sql(self) -> str:
+        return (
+            "SELECT p.id, "
+            "setweight(to_tsvector('simple', p.title), 'A') || "
+            "setweight(to_tsvector('simple', COALESCE((SELECT string_agg(t.name, ' ') "
+            "FROM {through} pt JOIN {tag} t ON t.id = pt.tag_id "
+            "WHERE pt.product_id = p.id), '')), 'B') || "
+            "setweight(to_tsvector('simple', COALESCE(p.description, '')), 'C') "
+            "FROM {product} p".format(
+                through=Product.tags.through._meta.db_table,
+                tag=Tag._meta.db_table,
+                product=Product._meta.db_table,
+            )
+        )
+
+    def index(self, product_ids: Iterable[int]) -> None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO {table} (product_id, document) "
+                "{documents} WHERE p.id = ANY(%s) "
+                "ON CONFLICT (product_id) DO UPDATE "
+                "SET document = EXCLUDED.document".format(
+                    table=self.table, documents=self.document_sql()
+                ),
+                [product_ids],
+            )
+
+    def remove(self, product_ids: Iterable[int]) -> None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {table} WHERE product_id = ANY(%s)".format(
+                    table=self.table
+                ),
+                [product_ids],
+            )
+
+    def rebuild(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM {table}".format(table=self.table))
+            cursor.execute(
+                "INSERT INTO {table} (product_id, document) {documents}".format(
+                    table=self.table, documents=self.document_sql()
+                )
+            )
+
+
+@lru_cache(maxsize=None)
+def get_search_backend() -> LikeSearchBackend:
+    """
+    Returns the backend named by `PRODUCT_SEARCH_BACKEND`, or the full-text
+    backend of the database when its index table exists.
+    """
+
+    path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+
+    backends = {
+        "sqlite": SQLiteSearchBackend,
+        "postgresql": PostgreSQLSearchBackend,
+    }
+    backend_class = backends.get(connection.vendor)
+    if backend_class and backend_class.table in connection.introspection.table_names():
+        return backend_class()
+    return LikeSearchBackend()
@@ -1,6 +1,10 @@
-from django.db.models import Avg
+from typing import Any, Dict, Iterable, List
+
 from rest_framework import serializers
 
+from megano.storage import media_url
+
+from .fields import CachedDateTimeField
 from .models import (
     CategoryIcon,
     Category,
@@ -8,52 +12,82 @@ from .models import (
     Review,
     Tag,
     Product,
-    SpecificationValue,
     Sale,
 )
+from .renditions import get_srcset
+
+
+class ReviewStatsMixin:
+    """
+    Reads review count and average rating from the denormalized
+    `review_count` and `rating_avg` columns of the product.
+    """
+
+    def get_reviews(self, obj):
+        return obj.review_count
+
+    def get_rating(self, obj):
+        return round(obj.rating_avg, 2) if obj.review_count else 0
 
 
 class CategoryIconSerializer(serializers.ModelSerializer):
     src = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = CategoryIcon
-        fields = ["src", "alt"]
+        fields = ["src", "alt", "srcset"]
 
     def get_src(self, obj):
-        return obj.src.url
+        return media_url(obj.src)
+
+    def get_srcset(self, obj):
+        return get_srcset(obj)
 
 
 class CategorySerializer(serializers.ModelSerializer):
     image = CategoryIconSerializer()
-    subcategories = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ["id", "title", "image", "subcategories"]
+        fields = ["id", "title", "image"]
 
-    def get_subcategories(self, obj):
-        if obj.parent is None:
-            subcategories = obj.subcategories.all()
-            if subcategories:
-                serializer = self.__class__(subcategories, many=True)
-                return serializer.data
-            return []
+
+def serialize_category_tree(categories: Iterable[Category]) -> List[Dict[str, Any]]:
+    """
+    Assembles the nested menu of active root categories from categories
+    ordered by `path`, where every parent comes before its children.
+    """
+
+    nodes: Dict[int, Dict[str, Any]] = {}
+    roots = []
+    for category in categories:
+        node = dict(CategorySerializer(category).data, subcategories=[])
+        nodes[category.pk] = node
+        if category.parent_id in nodes:
+            nodes[category.parent_id]["subcategories"].append(node)
+        elif category.parent_id is None and category.is_active:
+            roots.append(node)
+    return roots
 
 
 class ImageSerializer(serializers.ModelSerializer):
     src = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ["src", "alt"]
+        fields = ["src", "alt", "srcset"]
 
     def get_src(self, obj):
-        return obj.src.url
+        return media_url(obj.src)
+
+    def get_srcset(self, obj):
+        return get_srcset(obj)
 
 
 class ReviewSerializer(serializers.ModelSerializer):
-    date = serializers.DateTimeField(format="%Y-%m-%d %H:%M", read_only=True)
+    date = CachedDateTimeField(format="%Y-%m-%d %H:%M", read_only=True)
 
     class Meta:
         model = Review
@@ -66,10 +100,14 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
-    date = serializers.DateTimeField(format="%a %b %d %Y %H:%M:%S GMT%z (%Z)")
+class ProductSerializer(ReviewStatsMixin, serializers.ModelSerializer):
+    price = serializers.DecimalField(
+        source="current_price", max_digits=10, decimal_places=2, read_only=True
+    )
+    date = CachedDateTimeField(format="%a %b %d %Y %H:%M:%S GMT%z (%Z)")
     images = ImageSerializer(many=True)
-    reviews = ReviewSerializer(many=True)
+    reviews = ReviewSerializer(source="latest_reviews", many=True)
+    reviewsCount = serializers.IntegerField(source="review_count")
     rating = serializers.SerializerMethodField()
     specifications = serializers.SerializerMethodField()
     tags = serializers.SerializerMethodField()
@@ -89,30 +127,27 @@ class ProductSerializer(serializers.ModelSerializer):
             "images",
             "tags",
             "reviews",
+            "reviewsCount",
             "specifications",
             "rating",
         )
 
-    def get_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            average_rating = round(reviews.aggregate(Avg("rate"))["rate__avg"], 2)
-            return average_rating or 0
-        return 0
-
     def get_tags(self, obj):
         return [tag.name for tag in obj.tags.all()]
 
     def get_specifications(self, obj):
-        specifications = SpecificationValue.objects.filter(product=obj)
+        specifications = obj.product_values.all()
         return [
             {"name": specification.specification.name, "value": specification.value}
             for specification in specifications
         ]
 
 
-class LimitedProductSerializer(serializers.ModelSerializer):
-    date = serializers.DateTimeField(format="%a %b %d %Y %H:%M:%S GMT%z (%Z)")
+class LimitedProductSerializer(ReviewStatsMixin, serializers.ModelSerializer):
+    price = serializers.DecimalField(
+        source="current_price", max_digits=10, decimal_places=2, read_only=True
+    )
+    date = CachedDateTimeField(format="%a %b %d %Y %H:%M:%S GMT%z (%Z)")
     images = ImageSerializer(many=True)
     tags = TagSerializer(many=True)
     reviews = serializers.SerializerMethodField()
@@ -135,18 +170,12 @@ class LimitedProductSerializer(serializers.ModelSerializer):
             "rating",
         ]
 
-    def get_reviews(self, obj):
-        return obj.reviews.count()
-
-    def get_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            average_rating = round(reviews.aggregate(Avg("rate"))["rate__avg"], 2)
-            return average_rating or 0
-        return 0
-
 
-class CatalogItemSerializer(serializers.ModelSerializer):
+class CatalogItemSerializer(ReviewStatsMixin, serializers.ModelSerializer):
+    date = CachedDateTimeField()
+    price = serializers.DecimalField(
+        source="current_price", max_digits=10, decimal_places=2, read_only=True
+    )
     images = ImageSerializer(many=True)
     tags = TagSerializer(many=True)
     reviews = serializers.SerializerMethodField()
@@ -169,23 +198,13 @@ class CatalogItemSerializer(serializers.ModelSerializer):
             "rating",
         ]
 
-    def get_reviews(self, obj):
-        return obj.reviews.count()
-
-    def get_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            average_rating = round(reviews.aggregate(Avg("rate"))["rate__avg"], 2)
-            return average_rating or 0
-        return 0
-
 
 class SaleSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source="product.id")
     dateFrom = serializers.DateField(format="%d-%m")
     dateTo = serializers.DateField(format="%d-%m")
     price = serializers.SerializerMethodField()
-    title = serializers.SerializerMethodField()
+    title = serializers.CharField(source="product.title")
     images = ImageSerializer(source="product.images", many=True)
 
     class Meta:
@@ -194,6 +213,3 @@ class SaleSerializer(serializers.ModelSerializer):
 
     def get_price(self, obj):
         return obj.product.price
-
-    def get_title(self, obj):
-        return obj.product.title
@@ -0,0 +1,261 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from .cache import bump_generation_on_commit
+from .models import (
+    CategoryIcon,
+    PendingRendition,
+    PendingReview,
+    Product,
+    ProductImage,
+    ProductPopularity,
+    Review,
+    Sale,
+    Tag,
+)
+from .popularity import record_review
+from .pricing import reprice_products, resolve_price
+from .renditions import enqueue_renditions
+from .search import get_search_backend
+from .tag_index import tag_index
+
+
+def invalidate_model_cache(sender, **kwargs) -> None:
+    """Moves data cached from a model, e.g. responses, to a new generation."""
+
+    bump_generation_on_commit(sender._meta.model_name)
+
+
+for model in apps.get_app_config("app_products").get_models():
+    # Queued reviews and renditions are not served anywhere until processed
+    if model in (PendingReview, PendingRendition):
+        continue
+    post_save.connect(invalidate_model_cache, sender=model)
+    post_delete.connect(invalidate_model_cache, sender=model)
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def invalidate_product_tags_cache(sender, **kwargs) -> None:
+    bump_generation_on_commit("product")
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance: Product, **kwargs) -> None:
+    get_search_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance: Product, **kwargs) -> None:
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def index_product_tags(
+    sender, instance, action: str, reverse: bool, pk_set, **kwargs
+) -> None:
+    """Re-indexes the products whose tag names changed."""
+
+    if not reverse:
+        if action.startswith("post_"):
+            get_search_backend().index([instance.pk])
+    elif action == "pre_clear":
+        instance._tagged_product_ids = list(
+            instance.product_tags.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        get_search_backend().index(instance._tagged_product_ids)
+    elif action in ("post_add", "post_remove"):
+        get_search_backend().index(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_products(sender, instance: Tag, **kwargs) -> None:
+    instance._tagged_product_ids = list(
+        instance.product_tags.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def index_tag_products(sender, instance: Tag, **kwargs) -> None:
+    """Re-indexes the products of a renamed or deleted tag."""
+
+    product_ids = getattr(instance, "_tagged_product_ids", None)
+    if product_ids is None:
+        product_ids = instance.product_tags.values_list("pk", flat=True)
+    get_search_backend().index(product_ids)
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def update_tag_index(
+    sender, instance, action: str, reverse: bool, pk_set, **kwargs
+) -> None:
+    """Mirrors tag assignments into the in-process tag index on commit."""
+
+    if action == "pre_clear":
+        related = instance.product_tags if reverse else instance.tags
+        instance._cleared_pks = set(related.values_list("pk", flat=True))
+        return
+    if action == "post_clear":
+        action, pk_set = "post_remove", instance._cleared_pks
+    if action not in ("post_add", "post_remove"):
+        return
+
+    update = tag_index.add if action == "post_add" else tag_index.remove
+    pk = instance.pk
+
+    def apply():
+        if reverse:
+            update(pk, pk_set)
+        else:
+            for tag_id in pk_set:
+                update(tag_id, [pk])
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=Product)
+def discard_product_tags(sender, instance: Product, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: tag_index.discard_products([pk]))
+
+
+@receiver(post_delete, sender=Tag)
+def discard_tag(sender, instance: Tag, **kwargs) -> None:
+    pk = instance.pk
+    transaction.on_commit(lambda: tag_index.discard_tag(pk))
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rate(sender, instance: Review, raw: bool, **kwargs) -> None:
+    """Keeps the stored product and rate of an edited review."""
+
+    instance._stored_rating = None
+    if raw or instance.pk is None:
+        return
+    instance._stored_rating = (
+        Review.objects.filter(pk=instance.pk).values_list("product_id", "rate").first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def add_review_rating(
+    sender, instance: Review, created: bool, raw: bool, **kwargs
+) -> None:
+    """Updates the product rating columns after a review is created or edited."""
+
+    if raw:
+        return
+
+    stored = getattr(instance, "_stored_rating", None)
+    if not created and stored is not None:
+        product_id, rate = stored
+        if product_id == instance.product_id:
+            Product.shift_rating(instance.product_id, 0, instance.rate - rate)
+            return
+        Product.shift_rating(product_id, -1, -rate)
+
+    Product.shift_rating(instance.product_id, 1, instance.rate)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance: Review, **kwargs) -> None:
+    """Updates the product rating columns after a review is deleted."""
+
+    Product.shift_rating(instance.product_id, -1, -instance.rate)
+
+
+@receiver(post_save, sender=Product)
+def create_product_popularity(
+    sender, instance: Product, created: bool, raw: bool, **kwargs
+) -> None:
+    """Gives new products a place in the popularity ranking."""
+
+    if created and not raw:
+        ProductPopularity.objects.get_or_create(product=instance)
+
+
+@receiver(post_save, sender=Review)
+def add_review_popularity(
+    sender, instance: Review, created: bool, raw: bool, **kwargs
+) -> None:
+    """Counts new reviews, and reviews moved to another product, as demand."""
+
+    if raw:
+        return
+
+    stored = getattr(instance, "_stored_rating", None)
+    if not created:
+        if stored is None or stored[0] == instance.product_id:
+            return
+        moved = Review(product_id=stored[0], date=instance.date)
+        record_review(moved, sign=-1)
+    record_review(instance)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_popularity(sender, instance: Review, **kwargs) -> None:
+    record_review(instance, sign=-1)
+
+
+@receiver(pre_save, sender=Product)
+def set_current_price(sender, instance: Product, raw: bool, **kwargs) -> None:
+    """Keeps the stored current price in line with price edits."""
+
+    if not raw:
+        instance.current_price = resolve_price(instance)
+
+
+@receiver(pre_save, sender=Sale)
+def remember_sale_product(sender, instance: Sale, raw: bool, **kwargs) -> None:
+    instance._stored_product_id = None
+    if raw or instance.pk is None:
+        return
+    instance._stored_product_id = (
+        Sale.objects.filter(pk=instance.pk).values_list("product_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def reprice_sale_product(sender, instance: Sale, raw: bool = False, **kwargs) -> None:
+    """Reprices the products a sale was added to, changed on or removed from."""
+
+    if raw:
+        return
+    product_ids = {instance.product_id}
+    stored = getattr(instance, "_stored_product_id", None)
+    if stored is not None:
+        product_ids.add(stored)
+    reprice_products(product_ids)
+
+
+@receiver(pre_save, sender=ProductImage)
+@receiver(pre_save, sender=CategoryIcon)
+def remember_image_name(sender, instance, raw: bool, **kwargs) -> None:
+    instance._stored_name = None
+    if raw or instance.pk is None:
+        return
+    instance._stored_name = (
+        sender.objects.filter(pk=instance.pk).values_list("src", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=CategoryIcon)
+def queue_image_renditions(sender, instance, raw: bool, **kwargs) -> None:
+    """Queues new and replaced images for the `render_images` command."""
+
+    if raw or not instance.src:
+        return
+    if instance.src.name == getattr(instance, "_stored_name", None):
+        return
+    enqueue_renditions([instance])
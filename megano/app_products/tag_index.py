@@ -0,0 +1,150 @@
+import threading
+from collections import defaultdict
+from functools import reduce
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .cache import bump_generation, get_generation
+from .models import Product
+
+GENERATION = "product-tags"
+
+
+def bitmap_from_ids(ids: Iterable[int]) -> int:
+    """Builds a bitmap with the bit of every id set."""
+
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, "little")
+
+
+def ids_from_bitmap(bitmap: int) -> List[int]:
+    """Lists the set bits of a bitmap in ascending order."""
+
+    bits = bin(bitmap)[:1:-1]
+    ids = []
+    position = bits.find("1")
+    while position != -1:
+        ids.append(position)
+        position = bits.find("1", position + 1)
+    return ids
+
+
+class TagIndex:
+    """
+    In-process inverted index from tag id to the bitmap of its product ids.
+
+    The index is built on first use and kept current by the m2m signals of
+    `Product.tags`. Writes also bump a cache generation, so other processes
+    sharing the cache rebuild their copy on the next lookup.
+    """
+
+    def __init__(self) -> None:
+        self.bitmaps: Dict[int, int] = {}
+        self.generation: Optional[int] = None
+        self.lock = threading.Lock()
+
+    def rebuild(self) -> None:
+        generation = get_generation(GENERATION)
+        members = defaultdict(list)
+        rows = Product.tags.through.objects.values_list("tag_id", "product_id")
+        for tag_id, product_id in rows.iterator(chunk_size=10000):
+            members[tag_id].append(product_id)
+
+        bitmaps = {tag_id: bitmap_from_ids(ids) for tag_id, ids in members.items()}
+        with self.lock:
+            self.bitmaps = bitmaps
+            self.generation = generation
+
+    def ensure_current(self) -> None:
+        if self.generation != get_generation(GENERATION):
+            self.rebuild()
+
+    def changed(self, update) -> None:
+        """Applies an in-place update and publishes a new generation."""
+
+        with self.lock:
+            current = self.generation == get_generation(GENERATION)
+            if self.generation is not None:
+                update()
+            generation = bump_generation(GENERATION)
+            if current:
+                self.generation = generation
+
+    def add(self, tag_id: int, product_ids: Iterable[int]) -> None:
+        bitmap = bitmap_from_ids(product_ids)
+
+        def update():
+            self.bitmaps[tag_id] = self.bitmaps.get(tag_id, 0) | bitmap
+
+        self.changed(update)
+
+    def remove(self, tag_id: int, product_ids: Iterable[int]) -> None:
+        bitmap = bitmap_from_ids(product_ids)
+
+        def update():
+            self.bitmaps[tag_id] = self.bitmaps.get(tag_id, 0) & ~bitmap
+
+        self.changed(update)
+
+    def discard_products(self, product_ids: Iterable[int]) -> None:
+        bitmap = bitmap_from_ids(product_ids)
+
+        def update():
+            for tag_id in self.bitmaps:
+                self.bitmaps[tag_id] &= ~bitmap
+
+        self.changed(update)
+
+    def discard_tag(self, tag_id: int) -> None:
+        self.changed(lambda: self.bitmaps.pop(tag_id, None))
+
+    def lookup(self, tag_ids: Iterable[int], match_all: bool = False) -> int:
+        """
+        Returns the bitmap of products carrying all (AND) or any (OR) of the
+        given tags.
+        """
+
+        self.ensure_current()
+        bitmaps = [self.bitmaps.get(tag_id, 0) for tag_id in tag_ids]
+        if not bitmaps:
+            return 0
+        if match_all:
+            return reduce(lambda left, right: left & right, bitmaps)
+        return reduce(lambda left, right: left | right, bitmaps)
+
+    def filter(
+        self, queryset: Any, tags: Iterable[str], match_all: bool = False
+    ) -> Any:
+        """
+        Restricts a product queryset to the given tags. Large matches fall
+        back to semi-joins on the tag table, since they cannot be passed to
+        the database as an id list.
+        """
+
+        tag_ids = [int(tag) for tag in tags if str(tag).isdigit()]
+        if not tag_ids:
+            return queryset.none()
+
+        bitmap = self.lookup(tag_ids, match_all)
+        if bitmap.bit_count() <= getattr(settings, "TAG_INDEX_MAX_IDS", 5000):
+            return queryset.filter(id__in=ids_from_bitmap(bitmap))
+
+        through = Product.tags.through.objects
+        if match_all:
+            for tag_id in tag_ids:
+                queryset = queryset.filter(
+                    id__in=through.filter(tag_id=tag_id).values("product_id")
+                )
+            return queryset
+        return queryset.filter(
+            id__in=through.filter(tag_id__in=tag_ids).values("product_id")
+        )
+
+
+tag_index = TagIndex()
@@ -4,11 +4,13 @@ from .views import (
     CategoryListAPIView,
     ProductListAPIView,
     ProductDetailAPIView,
-    ReviewCreateAPIView,
+    ProductBatchAPIView,
+    ReviewListCreateAPIView,
     TagListAPIView,
     LimitedEditionProductListAPIView,
     PopularProductListAPIView,
     CatalogAPIView,
+    CatalogFacetsAPIView,
     BannersList,
     SalesList,
 )
@@ -19,12 +21,14 @@ app_name = "app_products"
 urlpatterns = [
     path("categories", CategoryListAPIView.as_view(), name="categories"),
     path("catalog", CatalogAPIView.as_view(), name="catalog"),
+    path("catalog/facets", CatalogFacetsAPIView.as_view(), name="catalog_facets"),
     path("banners", BannersList.as_view(), name="banners"),
     path("product", ProductListAPIView.as_view(), name="product_list"),
     path("product/<int:id>", ProductDetailAPIView.as_view(), name="product_detail"),
+    path("products", ProductBatchAPIView.as_view(), name="product_batch"),
     path(
         "product/<int:id>/reviews",
-        ReviewCreateAPIView.as_view(),
+        ReviewListCreateAPIView.as_view(),
         name="product_reviews",
     ),
     path(
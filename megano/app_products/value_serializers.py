@@ -0,0 +1,140 @@
+"""
+Read-only serializers that build product cards straight from `values()`
+rows, without instantiating models or running ModelSerializer fields.
+
+They reproduce the output of CatalogItemSerializer and
+LimitedProductSerializer exactly and are used by the hot list endpoints;
+the ModelSerializers remain the reference (see
+`benchmarks/product_serializers.py`).
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+from megano.storage import resolve_url
+
+from .fields import CachedDateTimeField
+from .models import ProductImage, ProductImageRendition, Tag
+from .renditions import build_srcset
+
+
+class ProductCardValuesSerializer:
+    """
+    Serializes products given as a queryset, or as rows returned by
+    `values()` on it, e.g. a page of them.
+    """
+
+    date_field: serializers.Field = CachedDateTimeField()
+    price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+    columns = (
+        "id",
+        "category_id",
+        "current_price",
+        "count",
+        "date",
+        "title",
+        "description",
+        "freeDelivery",
+        "review_count",
+        "rating_avg",
+    )
+
+    def __init__(self, instance: Any, many: bool = True, **kwargs: Any) -> None:
+        self.instance = instance
+
+    @classmethod
+    def values(cls, queryset: QuerySet) -> QuerySet:
+        """
+        Turns a product queryset into the rows this serializer reads, keeping
+        annotations such as `search_rank` for keyset pagination.
+        """
+
+        annotations = list(queryset.query.annotations)
+        return queryset.prefetch_related(None).values(*cls.columns, *annotations)
+
+    def get_rows(self) -> List[Dict[str, Any]]:
+        rows = self.instance
+        if isinstance(rows, QuerySet) and rows._fields is None:
+            rows = self.values(rows)
+        return list(rows)
+
+    def get_images(self, ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        storage = ProductImage._meta.get_field("src").storage
+        rows = list(
+            ProductImage.objects.filter(product_id__in=ids).values_list(
+                "pk", "product_id", "src", "alt"
+            )
+        )
+
+        rendition_storage = ProductImageRendition._meta.get_field("src").storage
+        renditions = defaultdict(list)
+        if rows:
+            rendition_rows = ProductImageRendition.objects.filter(
+                image_id__in=[row[0] for row in rows]
+            ).values_list("image_id", "format", "width", "src")
+            for image_id, image_format, width, src in rendition_rows:
+                renditions[image_id].append((image_format, width, src))
+
+        images = defaultdict(list)
+        for pk, product_id, src, alt in rows:
+            images[product_id].append(
+                {
+                    "src": resolve_url(storage, src),
+                    "alt": alt,
+                    "srcset": build_srcset(renditions[pk], rendition_storage),
+                }
+            )
+        return images
+
+    def get_tags(self, ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        # Same query as prefetch_related("tags"), so tags come in the same order
+        tags = defaultdict(list)
+        rows = Tag.objects.filter(product_tags__in=ids).values_list(
+            "product_tags", "id", "name"
+        )
+        for product_id, tag_id, name in rows:
+            tags[product_id].append({"id": tag_id, "name": name})
+        return tags
+
+    def to_representation(
+        self,
+        row: Dict[str, Any],
+        images: Dict[int, List[Dict[str, Any]]],
+        tags: Dict[int, List[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "category": row["category_id"],
+            "price": self.price_field.to_representation(row["current_price"]),
+            "count": row["count"],
+            "date": self.date_field.to_representation(row["date"]),
+            "title": row["title"],
+            "description": row["description"],
+            "freeDelivery": row["freeDelivery"],
+            "images": images.get(row["id"], []),
+            "tags": tags.get(row["id"], []),
+            "reviews": row["review_count"],
+            "rating": (round(row["rating_avg"], 2) if row["review_count"] else 0),
+        }
+
+    @cached_property
+    def data(self) -> List[Dict[str, Any]]:
+        rows = self.get_rows()
+        ids = [row["id"] for row in rows]
+        images = self.get_images(ids) if ids else {}
+        tags = self.get_tags(ids) if ids else {}
+        return [self.to_representation(row, images, tags) for row in rows]
+
+
+class CatalogItemValuesSerializer(ProductCardValuesSerializer):
+    """Output of CatalogItemSerializer."""
+
+
+class LimitedProductValuesSerializer(ProductCardValuesSerializer):
+    """Output of LimitedProductSerializer."""
+
+    date_field = CachedDateTimeField(format="%a %b %d %Y %H:%M:%S GMT%z (%Z)")
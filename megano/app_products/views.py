@@ -1,45 +1,114 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
 
-from django.db.models import Count, Avg
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
 from django.http import HttpResponse
 from rest_framework import status
-from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import ListAPIView, RetrieveAPIView, get_object_or_404
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Category, Product, Tag, Sale
+from .cache import CachedResponseMixin, get_generation, get_generations
+from .filters import CatalogFilters
+from .models import Category, Product, Review, Tag, Sale
+from .pagination import CachedCountPaginator, KeysetPagination, cursor_requested
+from .review_queue import enqueue_review
+from .search import get_search_backend
 from .serializers import (
     CategorySerializer,
     ProductSerializer,
     ReviewSerializer,
     TagSerializer,
-    LimitedProductSerializer,
-    CatalogItemSerializer,
     SaleSerializer,
+    serialize_category_tree,
+)
+from .value_serializers import (
+    CatalogItemValuesSerializer,
+    LimitedProductValuesSerializer,
 )
 
 
-class CategoryListAPIView(ListAPIView):
-    queryset = Category.objects.filter(parent=None, is_active=True)
+class CategoryListAPIView(CachedResponseMixin, ListAPIView):
+    queryset = (
+        Category.objects.select_related("image")
+        .prefetch_related("image__renditions")
+        .order_by("path")
+    )
     serializer_class = CategorySerializer
+    cache_models = ("category", "categoryicon")
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return Response(serialize_category_tree(self.get_queryset()))
 
 
 class ProductListAPIView(ListAPIView):
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.filter(is_active=True).with_details()
     serializer_class = ProductSerializer
 
 
 class ProductDetailAPIView(RetrieveAPIView):
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.filter(is_active=True).with_details()
     serializer_class = ProductSerializer
     lookup_field = "id"
 
 
-class ReviewCreateAPIView(APIView):
+class ProductBatchAPIView(ListAPIView):
+    """
+    Product details for `?ids=1,2,3`, in the requested order, loaded in a
+    fixed number of queries. Unknown and inactive ids are left out.
+    """
+
+    serializer_class = ProductSerializer
+
+    def get_ids(self) -> List[int]:
+        raw = self.request.query_params.get("ids", "")
+        try:
+            ids = [int(pk) for pk in raw.split(",") if pk.strip()]
+        except ValueError:
+            raise ValidationError({"ids": "Expected a comma-separated list of ids."})
+
+        ids = list(dict.fromkeys(ids))
+        limit = settings.PRODUCT_BATCH_MAX_IDS
+        if len(ids) > limit:
+            raise ValidationError(
+                {"ids": "At most {limit} ids are allowed.".format(limit=limit)}
+            )
+        return ids
+
+    def get_queryset(self) -> List[Product]:
+        ids = self.get_ids()
+        positions = {pk: position for position, pk in enumerate(ids)}
+        products = Product.objects.filter(is_active=True, pk__in=ids).with_details()
+        return sorted(products, key=lambda product: positions[product.pk])
+
+
+class ReviewCursorPagination(KeysetPagination):
+    page_size = 10
+    max_page_size = 50
+
+
+class ReviewListCreateAPIView(APIView):
+    pagination_class = ReviewCursorPagination
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        """Reviews of a product, newest first, a cursor page at a time."""
+
+        product = get_object_or_404(Product, pk=self.kwargs.get("id"), is_active=True)
+        reviews = Review.objects.filter(product=product).order_by("-date", "-id")
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        serializer = ReviewSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     def post(self, request: Request, *args, **kwargs) -> Response:
         product_id = self.kwargs.get("id")
+        if settings.REVIEW_QUEUE_ENABLED:
+            return self.enqueue(request, product_id)
+
         product = Product.objects.get(pk=product_id)
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
@@ -47,23 +116,37 @@ class ReviewCreateAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def enqueue(self, request: Request, product_id: int) -> Response:
+        """Queues a valid review for `drain_review_queue` and acknowledges it."""
+
+        if not Product.objects.filter(pk=product_id).exists():
+            raise NotFound()
+        serializer = ReviewSerializer(data=request.data)
+        if serializer.is_valid():
+            enqueue_review(product_id, serializer.validated_data)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class TagListAPIView(ListAPIView):
+
+class TagListAPIView(CachedResponseMixin, ListAPIView):
     queryset = Tag.objects.all()
+    cache_models = ("tag",)
     serializer_class = TagSerializer
 
 
-class LimitedEditionProductListAPIView(ListAPIView):
+class LimitedEditionProductListAPIView(CachedResponseMixin, ListAPIView):
     queryset = Product.objects.filter(limited_edition=True)[:16]
-    serializer_class = LimitedProductSerializer
+    serializer_class = LimitedProductValuesSerializer
+    cache_models = ("product", "productimage", "tag", "review")
 
 
-class PopularProductListAPIView(ListAPIView):
-    serializer_class = LimitedProductSerializer
+class PopularProductListAPIView(CachedResponseMixin, ListAPIView):
+    serializer_class = LimitedProductValuesSerializer
+    cache_models = ("product", "productimage", "tag", "review", "productpopularity")
 
     def get_queryset(self):
-        queryset = Product.objects.annotate(review_count=Count("reviews")).order_by(
-            "-review_count", "-count"
+        queryset = Product.objects.filter(popularity__isnull=False).order_by(
+            "-popularity__score", "-id"
         )[:8]
         return queryset
 
@@ -72,67 +155,86 @@ class CatalogPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = "limit"
     max_page_size = 100
+    count_cache_prefix = "catalog-count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_key = None
+        if view is not None and hasattr(view, "get_filters"):
+            self.count_key = view.get_filters().cache_key(
+                "{prefix}:{generation}".format(
+                    prefix=self.count_cache_prefix,
+                    generation=get_generation("product"),
+                )
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        return CachedCountPaginator(queryset, page_size, count_key=self.count_key)
 
     def get_paginated_response(self, data):
         return Response(data)
 
 
+class CatalogCursorPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
+
+
 class CatalogAPIView(ListAPIView):
-    serializer_class: Any = CatalogItemSerializer
+    serializer_class: Any = CatalogItemValuesSerializer
     pagination_class: Any = CatalogPagination
+    cursor_pagination_class: Any = CatalogCursorPagination
+
+    @property
+    def paginator(self) -> Any:
+        """Uses keyset pagination when the client asks for a cursor."""
+
+        if not hasattr(self, "_paginator"):
+            if cursor_requested(self.request):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_filters(self) -> CatalogFilters:
+        return CatalogFilters.from_query_params(self.request.query_params)
 
     def get_queryset(self) -> Any:
         queryset: Any = Product.objects.filter(is_active=True)
 
-        # Apply filters
-        filters: Dict[str, Any] = self.request.query_params
-
-        name: str = filters.get("filter[name]")
-        min_price: float = filters.get("filter[minPrice]")
-        max_price: float = filters.get("filter[maxPrice]")
-        free_delivery = filters.get("filter[freeDelivery]") == "true"
-        available = filters.get("filter[available]") == "true"
-
-        if name:
-            queryset = queryset.filter(title__icontains=name)
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        if free_delivery:
-            queryset = queryset.filter(freeDelivery=True)
-        if available:
-            queryset = queryset.filter(count__gt=0)
-
-        # Apply tag filter
-        tags = self.request.query_params.getlist("tags[]")
-        if tags:
-            queryset = queryset.filter(tags__in=tags)
+        queryset = self.get_filters().apply(queryset)
 
         # Apply sorting
         sort: str = self.request.query_params.get("sort", "date")
         sort_type: str = self.request.query_params.get("sortType", "dec")
+        sort_fields: Dict[str, str] = {
+            "price": "current_price",
+            "reviews": "review_count",
+            "rating": "rating_avg",
+        }
 
-        if sort == "price":
-            queryset = queryset.order_by(f'{"" if sort_type == "dec" else "-"}price')
-        elif sort == "reviews":
-            queryset = queryset.annotate(reviews_count=Count("reviews")).order_by(
-                f'{"" if sort_type == "dec" else "-"}reviews_count'
-            )
-        elif sort == "rating":
-            queryset = queryset.annotate(rating_avg=Avg("reviews__rate")).order_by(
-                f'{"" if sort_type == "dec" else "-"}rating_avg'
-            )
-        else:
-            queryset = queryset.order_by(f'{"" if sort_type == "dec" else "-"}date')
+        # `id` breaks ties so cursor pagination can key on (column, id)
+        direction: str = "" if sort_type == "dec" else "-"
+        field: str = sort_fields.get(sort, "date")
+        name: str = self.get_filters().name
+        if sort == "relevance" and name:
+            queryset = get_search_backend().rank(queryset, name)
+            field = "search_rank"
+        queryset = queryset.order_by(f"{direction}{field}", f"{direction}id")
 
         return queryset
 
     def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponse:
         queryset: Any = self.filter_queryset(self.get_queryset())
+        serializer_class: Any = self.get_serializer_class()
+        if hasattr(serializer_class, "values"):
+            queryset = serializer_class.values(queryset)
         page: Any = self.paginate_queryset(queryset)
         serializer: Any = self.get_serializer(page, many=True)
 
+        if isinstance(self.paginator, KeysetPagination):
+            return self.paginator.get_paginated_response(serializer.data)
+
         data: Dict[str, Any] = {
             "items": serializer.data,
             "currentPage": self.paginator.page.number,
@@ -141,15 +243,94 @@ class CatalogAPIView(ListAPIView):
         return self.get_paginated_response(data)
 
 
-class BannersList(APIView):
+class CatalogFacetsAPIView(APIView):
+    """
+    Returns facet counts for the filter sidebar: per category, per tag, per
+    price bucket and for the freeDelivery/available toggles, computed over
+    the products matching the current catalog filters.
+    """
+
+    cache_prefix = "catalog-facets"
+    # Facets carry category titles and tag names as well
+    cache_models = ("product", "category", "tag")
+
     def get(self, request: Request) -> Response:
+        filters = CatalogFilters.from_query_params(request.query_params)
+        generations = get_generations(self.cache_models)
+        key = filters.cache_key(
+            ":".join(
+                [self.cache_prefix]
+                + [str(generations[name][0]) for name in self.cache_models]
+            )
+        )
+        data = cache.get(key)
+        if data is None:
+            data = self.get_facets(filters)
+            cache.set(key, data, settings.CATALOG_FACETS_CACHE_TIMEOUT)
+        return Response(data)
+
+    def get_facets(self, filters: CatalogFilters) -> Dict[str, Any]:
+        queryset: Any = filters.apply(Product.objects.filter(is_active=True))
+        queryset = queryset.order_by()
+        bounds: List[Any] = [0, *settings.CATALOG_PRICE_BUCKETS, None]
+
+        # Totals, toggles and price buckets in one conditional aggregate
+        aggregates: Dict[str, Any] = {
+            "total": Count("id"),
+            "freeDelivery": Count("id", filter=Q(freeDelivery=True)),
+            "available": Count("id", filter=Q(count__gt=0)),
+        }
+        for index, (low, high) in enumerate(zip(bounds, bounds[1:])):
+            condition = Q(current_price__gte=low)
+            if high is not None:
+                condition &= Q(current_price__lt=high)
+            aggregates[f"price_{index}"] = Count("id", filter=condition)
+        totals: Dict[str, int] = queryset.aggregate(**aggregates)
+
+        categories = (
+            queryset.values("category_id", "category__title")
+            .annotate(count=Count("id"))
+            .order_by("category_id")
+        )
+        tags = (
+            Product.tags.through.objects.filter(product_id__in=queryset.values("id"))
+            .values("tag_id", "tag__name")
+            .annotate(count=Count("product_id"))
+            .order_by("tag_id")
+        )
+
+        return {
+            "total": totals["total"],
+            "freeDelivery": totals["freeDelivery"],
+            "available": totals["available"],
+            "prices": [
+                {"min": low, "max": high, "count": totals[f"price_{index}"]}
+                for index, (low, high) in enumerate(zip(bounds, bounds[1:]))
+            ],
+            "categories": [
+                {
+                    "id": row["category_id"],
+                    "title": row["category__title"],
+                    "count": row["count"],
+                }
+                for row in categories
+            ],
+            "tags": [
+                {"id": row["tag_id"], "name": row["tag__name"], "count": row["count"]}
+                for row in tags
+            ],
+        }
+
+
+class BannersList(CachedResponseMixin, ListAPIView):
+    serializer_class = LimitedProductValuesSerializer
+    cache_models = ("product", "category", "productimage", "tag", "review")
+
+    def get_queryset(self) -> Any:
         favourite_categories = [
             obj.pk for obj in Category.objects.filter(favourite=True)
         ]
-        banners = Product.objects.filter(category_id__in=favourite_categories)
-
-        serialized = LimitedProductSerializer(banners, many=True)
-        return Response(serialized.data)
+        return Product.objects.filter(category_id__in=favourite_categories)
 
 
 class SalesPagination(PageNumberPagination):
@@ -158,13 +339,30 @@ class SalesPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class SalesCursorPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
+
+
 class SalesList(APIView):
     pagination_class = SalesPagination
+    cursor_pagination_class = SalesCursorPagination
 
     def get(self, request: Request) -> Response:
         current_page = int(request.query_params.get("currentPage", 1))
 
-        items = Sale.objects.all().order_by("id")
+        items = (
+            Sale.objects.active()
+            .select_related("product")
+            .prefetch_related("product__images__renditions")
+            .order_by("id")
+        )
+        if cursor_requested(request):
+            paginator = self.cursor_pagination_class()
+            paginated_items = paginator.paginate_queryset(items, request)
+            serializer = SaleSerializer(paginated_items, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
         paginator = self.pagination_class()
         paginated_items = paginator.paginate_queryset(items, request)
 
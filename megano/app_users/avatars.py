@@ -0,0 +1,201 @@
+"""
+Avatar uploads off the request path.
+
+`AvatarUploadHandler` streams the uploaded file to a temporary file in
+chunks and rejects it as soon as it exceeds AVATAR_MAX_UPLOAD_SIZE. The
+view stages the file as a `PendingAvatar` and answers at once; the
+`process_avatars` command downscales it to AVATAR_MAX_DIMENSION, drops
+EXIF and other metadata by re-encoding it, and swaps it into
+`UserAvatar.src` with a single UPDATE.
+"""
+
+import logging
+import os
+from io import BytesIO
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import PendingAvatar, UserAvatar, user_avatar_directory_path
+
+logger = logging.getLogger(__name__)
+
+# Room for multipart boundaries and headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg", "png": "png"}
+
+
+class AvatarTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "The avatar file is too large."
+    default_code = "avatar_too_large"
+
+
+class AvatarUploadHandler(TemporaryFileUploadHandler):
+    """
+    Writes uploads to a temporary file whatever their size and stops
+    reading the request once they grow beyond `max_size` bytes.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = (
+            settings.AVATAR_MAX_UPLOAD_SIZE if max_size is None else max_size
+        )
+        self.received = 0
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise AvatarTooLarge()
+        return super().handle_raw_input(
+            input_data, META, content_length, boundary, encoding
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            raise AvatarTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def is_image(upload: UploadedFile) -> bool:
+    """Checks the header of an upload, without decoding the image."""
+
+    try:
+        with Image.open(upload) as image:
+            return image.format is not None
+    except (OSError, Image.DecompressionBombError):
+        return False
+    finally:
+        upload.seek(0)
+
+
+def stage_avatar(avatar: UserAvatar, upload: UploadedFile) -> PendingAvatar:
+    """
+    Queues an upload for processing, replacing an upload of the same
+    avatar that is still waiting. The temporary file is moved, not copied.
+    """
+
+    with transaction.atomic():
+        pending, _ = PendingAvatar.objects.get_or_create(avatar=avatar)
+        stale = pending.upload.name
+        pending.upload.save(upload.name, upload)
+    if stale and stale != pending.upload.name:
+        pending.upload.storage.delete(stale)
+    return pending
+
+
+def encode_avatar(file: FieldFile) -> ContentFile:
+    size = settings.AVATAR_MAX_DIMENSION
+    image_format = settings.AVATAR_FORMAT
+
+    with file.open("rb"), Image.open(file) as image:
+        # Let JPEG decode at a reduced scale, which large photos need most
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha and image_format == "jpeg":
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+
+    # Nothing but pixels is written, so EXIF (e.g. GPS tags) is dropped
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, quality=settings.AVATAR_QUALITY)
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+    name = "{stem}.{ext}".format(stem=stem, ext=EXTENSIONS[image_format])
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+def delete_replaced_file(avatar_files: Storage, avatar_id: int, name: str) -> None:
+    """
+    Deletes the file an avatar was replaced from, if it was written to the
+    directory of that avatar and no avatar points to it anymore. The shared
+    default file is never deleted.
+    """
+
+    directory = user_avatar_directory_path(UserAvatar(pk=avatar_id), "")
+    default = UserAvatar._meta.get_field("src").get_default()
+    if name == default or not name.startswith(directory):
+        return
+    if not UserAvatar.objects.filter(src=name).exists():
+        avatar_files.delete(name)
+
+
+def swap_avatar(item: PendingAvatar, name: Optional[str]) -> bool:
+    """
+    Points the avatar of a staged upload to its processed file `name`, or
+    leaves it when the upload could not be processed, and dequeues the
+    upload. Does nothing when another worker dequeued it or a new upload
+    replaced it in the meantime. The replaced files are deleted once it
+    commits.
+    """
+
+    with transaction.atomic():
+        claimed = PendingAvatar.objects.select_for_update(skip_locked=True).filter(
+            pk=item.pk, upload=item.upload.name
+        )
+        if not claimed.exists():
+            return False
+        avatar = UserAvatar.objects.filter(pk=item.avatar_id)
+        replaced = avatar.values_list("src", flat=True).first()
+        if name:
+            # Readers see either the old file or the new one, both stored
+            avatar.update(src=name)
+        claimed.delete()
+
+        def clean_up():
+            if name and replaced:
+                delete_replaced_file(
+                    UserAvatar._meta.get_field("src").storage, item.avatar_id, replaced
+                )
+            item.upload.storage.delete(item.upload.name)
+
+        transaction.on_commit(clean_up)
+    return True
+
+
+def process_pending_avatars(batch_size: int) -> int:
+    """
+    Processes up to `batch_size` staged uploads, oldest first, and returns
+    how many were handled. Uploads are encoded outside of any transaction
+    and swapped in by a short one each; when concurrent workers process the
+    same upload, the first to finish keeps its file.
+    """
+
+    avatar_files = UserAvatar._meta.get_field("src").storage
+    pending: List[PendingAvatar] = list(
+        PendingAvatar.objects.select_related("avatar")[:batch_size]
+    )
+    for item in pending:
+        name = None
+        try:
+            content = encode_avatar(item.upload)
+        except (OSError, ValueError, Image.DecompressionBombError) as error:
+            logger.warning("Cannot process avatar %s: %s", item.avatar_id, error)
+        else:
+            item.avatar.src.save(content.name, content, save=False)
+            name = item.avatar.src.name
+
+        if not swap_avatar(item, name) and name:
+            avatar_files.delete(name)
+
+    return len(pending)
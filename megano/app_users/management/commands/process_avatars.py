@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app_users.avatars import process_pending_avatars
+
+
+class Command(BaseCommand):
+    help = "Downscales and re-encodes uploaded avatars, then puts them in place."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.AVATAR_BATCH_SIZE,
+            help="Avatars processed per transaction.",
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep waiting for new uploads instead of exiting when empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_pending_avatars(options["batch_size"])
+            total += processed
+            if processed:
+                continue
+            if not options["follow"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS("Processed {count} avatars.".format(count=total))
+        )
@@ -0,0 +1,49 @@
+# Generated by Django 5.0 on 2026-10-18 17:52
+
+import app_users.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_users", "0002_userprofile"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingAvatar",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "upload",
+                    models.FileField(
+                        storage=app_users.models.avatar_upload_storage,
+                        upload_to="avatars/",
+                    ),
+                ),
+                ("queued_at", models.DateTimeField(auto_now=True)),
+                (
+                    "avatar",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending",
+                        to="app_users.useravatar",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Pending avatar",
+                "verbose_name_plural": "Pending avatars",
+                "ordering": ["queued_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 18:21
+
+import app_users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_users", "0003_pendingavatar"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="useravatar",
+            name="src",
+            field=models.ImageField(
+                default="avatars/default/default.jpg",
+                max_length=255,
+                upload_to=app_users.models.user_avatar_directory_path,
+                verbose_name="Avatar link",
+            ),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 
 
@@ -8,11 +10,18 @@ def user_avatar_directory_path(instance: "UserAvatar", filename: str) -> str:
     return "avatars/avatar_{pk}/{filename}".format(pk=instance.pk, filename=filename)
 
 
+def avatar_upload_storage() -> FileSystemStorage:
+    """Private storage for uploads waiting to be processed, not served."""
+
+    return FileSystemStorage(location=settings.AVATAR_UPLOAD_ROOT)
+
+
 class UserAvatar(models.Model):
     """Model for storing the user's avatar."""
 
     src = models.ImageField(
         upload_to=user_avatar_directory_path,
+        max_length=255,
         default="avatars/default/default.jpg",
         verbose_name="Avatar link",
     )
@@ -56,3 +65,24 @@ class UserProfile(models.Model):
 
     def __str__(self) -> str:
         return "{user}".format(user=self.user)
+
+
+class PendingAvatar(models.Model):
+    """
+    An uploaded avatar waiting for the `process_avatars` command to
+    downscale and re-encode it into `UserAvatar.src`.
+    """
+
+    avatar = models.OneToOneField(
+        UserAvatar, on_delete=models.CASCADE, related_name="pending"
+    )
+    upload = models.FileField(upload_to="avatars/", storage=avatar_upload_storage)
+    queued_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Pending avatar"
+        verbose_name_plural = "Pending avatars"
+        ordering = ["queued_at"]
+
+    def __str__(self) -> str:
+        return "Pending: {avatar}".format(avatar=self.avatar)
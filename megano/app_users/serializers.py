@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from megano.storage import media_url
+
 from .models import UserAvatar, UserProfile
 
 
@@ -17,7 +19,7 @@ class AvatarSerializer(serializers.ModelSerializer):
         fields = ["src", "alt"]
 
     def get_src(self, obj):
-        return obj.src.url
+        return media_url(obj.src)
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -11,6 +11,7 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .avatars import AvatarUploadHandler, is_image, stage_avatar
 from .models import UserAvatar, UserProfile
 from .serializers import (
     SignUpSerializer,
@@ -114,31 +115,37 @@ class AvatarUpdateView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser]
 
-    def post(self, request: Request, *args, **kwargs) -> Response:
-        """Updates the user's avatar."""
-        try:
-            avatar = request.user.profile.avatar
-
-            if "avatar" in request.FILES:
-                # Удаление старого файла перед сохранением нового
-                if avatar.src:
-                    avatar.src.delete()
+    def initial(self, request: Request, *args, **kwargs) -> None:
+        # Before authentication, whose CSRF check may already read the body
+        request._request.upload_handlers = [AvatarUploadHandler(request._request)]
+        super().initial(request, *args, **kwargs)
 
-                avatar.src = request.FILES["avatar"]
-                avatar.save()
-
-                return Response(status=status.HTTP_200_OK)
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Queues the uploaded avatar for the `process_avatars` command, which
+        downscales and re-encodes it and then replaces the user's avatar.
+        """
 
+        upload = request.FILES.get("avatar")
+        if upload is None:
             return Response(
                 {"error": "No 'avatar' file provided."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-        except Exception as e:
+        if not is_image(upload):
             return Response(
-                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": "The 'avatar' file is not an image."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
+        profile = request.user.profile
+        if profile.avatar is None:
+            profile.avatar = UserAvatar.objects.create()
+            profile.save(update_fields=["avatar"])
+        stage_avatar(profile.avatar, upload)
+
+        return Response(status=status.HTTP_202_ACCEPTED)
+
 
 class PasswordUpdateView(APIView):
     permission_classes = [IsAuthenticated]
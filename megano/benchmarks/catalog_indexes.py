@@ -0,0 +1,201 @@
+"""
+Catalog filter/sort benchmark for the Product indexes.
+
+Seeds a throw-away SQLite database at the latest schema, runs every
+catalog filter/sort combination through `CatalogAPIView.get_queryset`
+without and with the indexes declared on Product and reports the query
+plan and p50/p99 latency of the page query and the page count.
+
+Usage (from the `megano` directory):
+    python benchmarks/catalog_indexes.py --products 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "megano.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+CASES = [
+    ("date", {}),
+    ("price", {"sort": "price"}),
+    ("price desc", {"sort": "price", "sortType": "inc"}),
+    ("reviews", {"sort": "reviews", "sortType": "inc"}),
+    ("rating", {"sort": "rating", "sortType": "inc"}),
+    ("price range", {"filter[minPrice]": "100", "filter[maxPrice]": "500"}),
+    ("free delivery", {"filter[freeDelivery]": "true", "sort": "price"}),
+    ("available", {"filter[available]": "true", "sortType": "inc"}),
+    ("tag", {"tags[]": "1", "sort": "rating", "sortType": "inc"}),
+    ("name", {"filter[name]": "product 4242"}),
+]
+
+
+def configure(db_path: str) -> None:
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.ALLOWED_HOSTS = ["*"]
+    django.setup()
+
+
+def seed(products: int, batch_size: int = 10000) -> None:
+    from django.utils import timezone
+
+    from app_products.models import Category, Product, Tag
+    from app_products.search import get_search_backend
+
+    rnd = random.Random(42)
+    # Saved one by one, which builds their materialized paths
+    categories = [
+        Category.objects.create(title="Category {0}".format(i), is_active=True)
+        for i in range(20)
+    ]
+    tags = Tag.objects.bulk_create([Tag(name="Tag {0}".format(i)) for i in range(50)])
+    through = Product.tags.through
+    now = timezone.now()
+
+    for start in range(0, products, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, products)):
+            price = Decimal(rnd.randint(100, 500000)) / 100
+            review_count = rnd.randint(0, 50)
+            rating_sum = sum(rnd.randint(1, 5) for _ in range(review_count))
+            batch.append(
+                Product(
+                    category=rnd.choice(categories),
+                    title="Product {0}".format(i),
+                    price=price,
+                    current_price=price,
+                    count=rnd.choice((0, rnd.randint(1, 100))),
+                    description="Description of product {0}".format(i),
+                    freeDelivery=rnd.random() < 0.3,
+                    is_active=rnd.random() < 0.9,
+                    review_count=review_count,
+                    rating_sum=rating_sum,
+                    rating_avg=rating_sum / review_count if review_count else 0,
+                )
+            )
+        created = Product.objects.bulk_create(batch)
+        Product.objects.filter(pk__in=[product.pk for product in created]).update(
+            date=now - timedelta(minutes=start)
+        )
+        through.objects.bulk_create(
+            through(product_id=product.pk, tag_id=tag.pk)
+            for product in created
+            for tag in rnd.sample(tags, rnd.randint(0, 3))
+        )
+        sys.stdout.write("\rseeded {0}/{1}".format(start + len(batch), products))
+        sys.stdout.flush()
+    sys.stdout.write("\n")
+    get_search_backend().rebuild()
+
+
+def set_indexes(enabled: bool) -> None:
+    """Creates or drops the indexes declared on Product."""
+
+    from django.db import connection
+
+    from app_products.models import Product
+
+    with connection.schema_editor() as schema_editor:
+        for index in Product._meta.indexes:
+            if enabled:
+                schema_editor.add_index(Product, index)
+            else:
+                schema_editor.remove_index(Product, index)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_cases(label: str, repeat: int) -> dict:
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from app_products.views import CatalogAPIView
+
+    factory = APIRequestFactory()
+    results = {}
+    print("\n=== {0} ===".format(label))
+
+    for name, params in CASES:
+        view = CatalogAPIView()
+        view.request = Request(factory.get("/api/catalog", params))
+        queryset = view.get_queryset()
+
+        page_timings, count_timings = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset[:20])
+            page_timings.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            queryset.count()
+            count_timings.append((time.perf_counter() - started) * 1000)
+
+        results[name] = (
+            statistics.median(page_timings),
+            percentile(page_timings, 0.99),
+            statistics.median(count_timings),
+            percentile(count_timings, 0.99),
+        )
+        print("\n-- {0}: {1}".format(name, params))
+        print(queryset[:20].explain())
+        print(
+            "page p50={0:.2f}ms p99={1:.2f}ms | count p50={2:.2f}ms p99={3:.2f}ms".format(
+                *results[name]
+            )
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "benchmark.sqlite3"))
+
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+        seed(args.products)
+
+        set_indexes(False)
+        before = run_cases("without indexes", args.repeat)
+
+        set_indexes(True)
+        after = run_cases("with indexes", args.repeat)
+
+    print(
+        "\n{0:<14} {1:>22} {2:>22}".format(
+            "case", "page p50/p99 ms", "count p50/p99 ms"
+        )
+    )
+    for name, _ in CASES:
+        b, a = before[name], after[name]
+        print(
+            "{0:<14} {1:>9.2f}/{2:<6.2f}->{3:>7.2f}/{4:<6.2f} "
+            "{5:>9.2f}/{6:<6.2f}->{7:>7.2f}/{8:<6.2f}".format(
+                name, b[0], b[1], a[0], a[1], b[2], b[3], a[2], a[3]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Timestamp formatting micro-benchmark.
+
+Serializes the same in-memory list of reviews and formats the same
+timestamps repeatedly, as a hot list endpoint does across requests, with
+DRF's DateTimeField and with the LRU-backed CachedDateTimeField, and
+reports throughput. Needs no database.
+
+Usage (from the `megano` directory):
+    python benchmarks/datetime_formatting.py --items 100 --repeat 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "megano.settings")
+
+import django  # noqa: E402
+
+PRODUCT_DATE_FORMAT = "%a %b %d %Y %H:%M:%S GMT%z (%Z)"
+
+
+def throughput(function, items: int, repeat: int) -> float:
+    """Median items per second of `function` over `repeat` runs."""
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return items / statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    django.setup()
+
+    from django.utils import timezone
+    from rest_framework import serializers
+
+    from app_products.fields import CachedDateTimeField
+    from app_products.models import Review
+    from app_products.serializers import ReviewSerializer
+
+    class PlainReviewSerializer(ReviewSerializer):
+        date = serializers.DateTimeField(format="%Y-%m-%d %H:%M", read_only=True)
+
+    now = timezone.now()
+    dates = [now - timedelta(minutes=i) for i in range(args.items)]
+    reviews = [
+        Review(author="Author", email="a@example.com", text="Text", rate=5, date=date)
+        for date in dates
+    ]
+
+    plain_field = serializers.DateTimeField(format=PRODUCT_DATE_FORMAT)
+    cached_field = CachedDateTimeField(format=PRODUCT_DATE_FORMAT)
+    cases = [
+        (
+            "field",
+            lambda: [plain_field.to_representation(date) for date in dates],
+            lambda: [cached_field.to_representation(date) for date in dates],
+        ),
+        (
+            "reviews",
+            lambda: PlainReviewSerializer(reviews, many=True).data,
+            lambda: ReviewSerializer(reviews, many=True).data,
+        ),
+    ]
+
+    print("{0:<9} {1:>26}".format("case", "items/s plain -> cached"))
+    for name, plain, cached in cases:
+        if plain() != cached():
+            raise SystemExit("{0}: outputs differ".format(name))
+        before = throughput(plain, args.items, args.repeat)
+        after = throughput(cached, args.items, args.repeat)
+        print(
+            "{0:<9} {1:>11,.0f} -> {2:>11,.0f} ({3:.1f}x)".format(
+                name, before, after, after / before
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Product card serialization benchmark.
+
+Seeds a throw-away SQLite database and serializes pages of product cards
+with the ModelSerializers (rendered by JSONRenderer) and with the
+values-based serializers (rendered by FastJSONRenderer). Checks that both
+produce the same bytes and reports the per-item CPU cost of serializing
+(queries included) and of rendering.
+
+Usage (from the `megano` directory):
+    python benchmarks/product_serializers.py --products 10000 --page 100
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "megano.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def configure(db_path: str) -> None:
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.ALLOWED_HOSTS = ["*"]
+    django.setup()
+
+
+def seed(products: int, batch_size: int = 5000) -> None:
+    from django.utils import timezone
+
+    from app_products.models import Category, Product, ProductImage, Tag
+
+    rnd = random.Random(42)
+    categories = Category.objects.bulk_create(
+        [Category(title="Category {0}".format(i), is_active=True) for i in range(20)]
+    )
+    tags = Tag.objects.bulk_create([Tag(name="Tag {0}".format(i)) for i in range(50)])
+    through = Product.tags.through
+    now = timezone.now()
+
+    for start in range(0, products, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, products)):
+            price = Decimal(rnd.randint(100, 500000)) / 100
+            review_count = rnd.randint(0, 50)
+            rating_sum = sum(rnd.randint(1, 5) for _ in range(review_count))
+            batch.append(
+                Product(
+                    category=rnd.choice(categories),
+                    title="Product {0} – «Ünïcode»".format(i),
+                    price=price,
+                    current_price=price,
+                    count=rnd.randint(0, 100),
+                    description="Description of product {0}".format(i),
+                    freeDelivery=rnd.random() < 0.3,
+                    limited_edition=rnd.random() < 0.1,
+                    review_count=review_count,
+                    rating_sum=rating_sum,
+                    rating_avg=rating_sum / review_count if review_count else 0,
+                )
+            )
+        created = Product.objects.bulk_create(batch)
+        Product.objects.filter(pk__in=[product.pk for product in created]).update(
+            date=now - timedelta(minutes=start)
+        )
+        ProductImage.objects.bulk_create(
+            ProductImage(
+                product_id=product.pk,
+                src="images/product_{0}/image_{1}.jpg".format(product.pk, n),
+                alt="Image {0}".format(n),
+            )
+            for product in created
+            for n in range(rnd.randint(1, 6))
+        )
+        through.objects.bulk_create(
+            through(product_id=product.pk, tag_id=tag.pk)
+            for product in created
+            for tag in rnd.sample(tags, rnd.randint(0, 3))
+        )
+        sys.stdout.write("\rseeded {0}/{1}".format(start + len(batch), products))
+        sys.stdout.flush()
+    sys.stdout.write("\n")
+
+
+def cpu_time(function, repeat: int) -> float:
+    """Median CPU seconds of `function` over `repeat` runs."""
+
+    samples = []
+    for _ in range(repeat):
+        started = time.process_time()
+        function()
+        samples.append(time.process_time() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "benchmark.sqlite3"))
+
+        from django.core.management import call_command
+        from rest_framework.renderers import JSONRenderer
+
+        from app_products.models import Product
+        from app_products.serializers import (
+            CatalogItemSerializer,
+            LimitedProductSerializer,
+        )
+        from app_products.value_serializers import (
+            CatalogItemValuesSerializer,
+            LimitedProductValuesSerializer,
+        )
+        from megano.renderers import FastJSONRenderer
+
+        call_command("migrate", verbosity=0)
+        seed(args.products)
+
+        active = Product.objects.filter(is_active=True)
+        cases = [
+            (
+                "catalog",
+                CatalogItemSerializer,
+                CatalogItemValuesSerializer,
+                active.order_by("current_price", "id")[: args.page],
+            ),
+            (
+                "limited",
+                LimitedProductSerializer,
+                LimitedProductValuesSerializer,
+                Product.objects.filter(limited_edition=True)[: args.page],
+            ),
+            (
+                "popular",
+                LimitedProductSerializer,
+                LimitedProductValuesSerializer,
+                active.order_by("-review_count", "-id")[: args.page],
+            ),
+        ]
+
+        print(
+            "\n{0:<9} {1:>7} {2:>22} {3:>22}".format(
+                "case", "items", "serialize us/item", "render us/item"
+            )
+        )
+        for name, model_serializer, values_serializer, queryset in cases:
+
+            def model_data():
+                products = queryset.prefetch_related("images__renditions", "tags")
+                return model_serializer(products, many=True).data
+
+            def values_data():
+                return values_serializer(queryset).data
+
+            reference = JSONRenderer().render(model_data())
+            fast = FastJSONRenderer().render(values_data())
+            if reference != fast:
+                raise SystemExit("{0}: outputs differ".format(name))
+
+            items = len(values_data()) or 1
+            data = model_data()
+            per_item = 1e6 / items
+            timings = (
+                cpu_time(model_data, args.repeat) * per_item,
+                cpu_time(values_data, args.repeat) * per_item,
+                cpu_time(lambda: JSONRenderer().render(data), args.repeat) * per_item,
+                cpu_time(lambda: FastJSONRenderer().render(data), args.repeat)
+                * per_item,
+            )
+            print(
+                "{0:<9} {1:>7} {2:>9.1f} ->{3:>9.1f} {4:>9.1f} ->{5:>9.1f}".format(
+                    name, items, *timings
+                )
+            )
+        print("\nOutputs are byte-identical for every case.")
+
+
+if __name__ == "__main__":
+    main()
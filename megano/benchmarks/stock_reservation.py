@@ -0,0 +1,232 @@
+"""
+Concurrent checkout benchmark for the stock reservations.
+
+Seeds a throw-away SQLite database with a few hot products and lets many
+threads check out random lines of them at once, either through
+`reserve_stock`/`sell_stock` or through a naive read-modify-write of
+`Product.count`. Checks per product that the units sold plus the units
+left equal the initial stock, i.e. nothing was oversold, and reports the
+throughput of each mode.
+
+Usage (from the `megano` directory):
+    python benchmarks/stock_reservation.py --threads 16 --checkouts 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "megano.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def configure(db_path: str) -> None:
+    settings.DATABASES["default"]["NAME"] = db_path
+    # Writers queue on the database lock instead of failing at once
+    settings.DATABASES["default"]["OPTIONS"] = {"timeout": 60}
+    django.setup()
+
+    from django.db.backends.sqlite3.base import DatabaseWrapper
+
+    # Take the write lock when a transaction starts, so that transactions
+    # queue like on PostgreSQL row locks instead of failing to upgrade
+    # their read lock (the `transaction_mode` option of Django 5.1)
+    DatabaseWrapper._start_transaction_under_autocommit = lambda self: (
+        self.cursor().execute("BEGIN IMMEDIATE")
+    )
+
+
+def seed(skus: int, stock: int):
+    from django.contrib.auth.models import User
+
+    from app_products.models import Category, Product
+    from app_users.models import UserProfile
+
+    category = Category.objects.create(title="Category", is_active=True)
+    Product.objects.bulk_create(
+        Product(category=category, title="Product {0}".format(i), price=1, count=0)
+        for i in range(skus)
+    )
+    user = User.objects.create_user(username="buyer", password="buyer")
+    profile, _ = UserProfile.objects.get_or_create(user=user)
+    return list(Product.objects.values_list("pk", flat=True)), profile
+
+
+def reset_stock(product_ids, stock: int) -> None:
+    from app_products.models import Product
+
+    Product.objects.filter(pk__in=product_ids).update(count=stock)
+
+
+def retrying(function, stats: Counter):
+    """Calls `function` until the database lets its transaction through."""
+
+    from django.db import OperationalError
+
+    while True:
+        try:
+            return function()
+        except OperationalError:
+            # The database stayed locked for longer than the timeout
+            stats["retried"] += 1
+
+
+def reserved_checkout(profile, lines, stats: Counter) -> bool:
+    from django.db import transaction
+
+    from app_orders.models import Order
+    from app_orders.stock import OutOfStock, reserve_stock, sell_stock
+
+    def place():
+        with transaction.atomic():
+            order = Order.objects.create(user=profile, totalCost=0)
+            reserve_stock(order, lines)
+        return order
+
+    try:
+        order = retrying(place, stats)
+    except OutOfStock:
+        return False
+    retrying(lambda: sell_stock(order), stats)
+    return True
+
+
+def naive_checkout(profile, lines, stats: Counter) -> bool:
+    from app_orders.models import Order
+    from app_products.models import Product
+
+    Order.objects.create(user=profile, totalCost=0)
+    products = Product.objects.in_bulk([product_id for product_id, _ in lines])
+    if any(products[product_id].count < count for product_id, count in lines):
+        return False
+    for product_id, count in lines:
+        stock = products[product_id].count
+        Product.objects.filter(pk=product_id).update(count=stock - count)
+    return True
+
+
+def run(checkout, args, product_ids, profile) -> dict:
+    from django.db import connection
+
+    sold = Counter()
+    stats = Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    def worker(seed: int) -> None:
+        rnd = random.Random(seed)
+        local_sold, local_stats = Counter(), Counter()
+        start.wait()
+        for _ in range(args.checkouts):
+            lines = [
+                (product_id, rnd.randint(1, args.max_count))
+                for product_id in rnd.sample(product_ids, args.lines)
+            ]
+            placed = checkout(profile, lines, local_stats)
+            local_stats["placed" if placed else "rejected"] += 1
+            if placed:
+                local_sold.update(dict(lines))
+        connection.close()
+        with lock:
+            sold.update(local_sold)
+            stats.update(local_stats)
+
+    threads = [
+        threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats["seconds"] = time.perf_counter() - started
+    stats["sold"] = sold
+    return stats
+
+
+def check(product_ids, stock: int, sold: Counter) -> int:
+    """
+    Units sold beyond the stock taken from the products, counting units
+    still reserved as taken. Raises when stock went missing instead.
+    """
+
+    from django.db.models import Sum
+
+    from app_orders.models import StockReservation
+    from app_products.models import Product
+
+    remaining = dict(
+        Product.objects.filter(pk__in=product_ids).values_list("pk", "count")
+    )
+    held = dict(
+        StockReservation.objects.values("product_id")
+        .annotate(units=Sum("count"))
+        .values_list("product_id", "units")
+    )
+    oversold = 0
+    for product_id in product_ids:
+        taken = stock - remaining[product_id]
+        sold_units = sold[product_id] + held.get(product_id, 0)
+        if sold_units < taken:
+            raise AssertionError(
+                "{0} units of product {1} went missing".format(
+                    taken - sold_units, product_id
+                )
+            )
+        oversold += sold_units - taken
+    return oversold
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--skus", type=int, default=10)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--checkouts", type=int, default=200, help="Per thread.")
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--max-count", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "benchmark.sqlite3"))
+
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+        product_ids, profile = seed(args.skus, args.stock)
+
+        print(
+            "{0:<9} {1:>11} {2:>8} {3:>9} {4:>8} {5:>9}".format(
+                "mode", "checkouts/s", "placed", "rejected", "retried", "oversold"
+            )
+        )
+        for mode, checkout in (
+            ("naive", naive_checkout),
+            ("reserved", reserved_checkout),
+        ):
+            reset_stock(product_ids, args.stock)
+            stats = run(checkout, args, product_ids, profile)
+            oversold = check(product_ids, args.stock, stats["sold"])
+            print(
+                "{0:<9} {1:>11.0f} {2:>8} {3:>9} {4:>8} {5:>9}".format(
+                    mode,
+                    (stats["placed"] + stats["rejected"]) / stats["seconds"],
+                    stats["placed"],
+                    stats["rejected"],
+                    stats["retried"],
+                    oversold,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
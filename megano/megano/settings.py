@@ -105,6 +105,15 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+REST_FRAMEWORK = {
+    # orjson-backed when installed, same output as the stdlib JSONRenderer
+    "DEFAULT_RENDERER_CLASSES": [
+        "megano.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -117,6 +126,28 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Cached responses and their generation counters must be shared by all
+# workers in production, e.g. with a Redis-compatible server:
+#     "BACKEND": "django.core.cache.backends.redis.RedisCache",
+#     "LOCATION": "redis://127.0.0.1:6379",
+# or a directory on a shared disk:
+#     "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+#     "LOCATION": BASE_DIR / "cache",
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+# Cache alias and timeout for responses of read-mostly storefront endpoints
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 3600
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
@@ -125,6 +156,30 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads are stored under content-hashed names, so media can be served
+# with far-future cache headers
+STORAGES = {
+    "default": {"BACKEND": "megano.storage.MediaStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Base URL of a CDN serving MEDIA_ROOT, used in media URLs instead of MEDIA_URL
+MEDIA_CDN_URL = None
+
+# Media URLs kept resolved in memory per process
+MEDIA_URL_CACHE_SIZE = 4096
+
+# Uploaded avatars wait in AVATAR_UPLOAD_ROOT, which must not be served,
+# until `manage.py process_avatars` fits them into AVATAR_MAX_DIMENSION
+# pixels and re-encodes them; larger uploads than AVATAR_MAX_UPLOAD_SIZE
+# bytes are refused while they stream in
+AVATAR_UPLOAD_ROOT = BASE_DIR / "uploads"
+AVATAR_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+AVATAR_MAX_DIMENSION = 512
+AVATAR_FORMAT = "jpeg"
+AVATAR_QUALITY = 85
+AVATAR_BATCH_SIZE = 20
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -132,3 +187,71 @@ MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CART_SESSION_ID = "cart"
+
+# Class storing carts: the session-backed `app_orders.cart.Cart`, or
+# `app_orders.cart.DatabaseCart`, which keeps them in tables so changes
+# write one row and carts of logged-in users follow them across devices;
+# anonymous database carts are found through their id in the session
+CART_BACKEND = "app_orders.cart.Cart"
+CART_ID_SESSION_KEY = "cart_id"
+
+# Seconds placed orders hold their units of stock before
+# `manage.py release_reservations`, which frees orders in batches of
+# STOCK_RESERVATION_BATCH_SIZE, returns them unless the order was paid
+STOCK_RESERVATION_TIMEOUT = 15 * 60
+STOCK_RESERVATION_BATCH_SIZE = 100
+
+# Seconds the response to an order, confirmation or payment request sent
+# with an Idempotency-Key header is replayed to retries with that key, and
+# seconds after which a key claimed by a request that never answered can
+# be used again; `manage.py clear_idempotency_keys` deletes expired keys
+IDEMPOTENCY_KEY_TIMEOUT = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_BATCH_SIZE = 1000
+
+# Seconds a catalog result count stays cached for `lastPage`
+CATALOG_COUNT_CACHE_TIMEOUT = 60
+
+# Use the database planner estimate instead of COUNT(*) when it predicts at
+# least this many rows (PostgreSQL only, None disables estimates)
+CATALOG_COUNT_ESTIMATE_THRESHOLD = None
+
+# Tag filters matching more products than this use a semi-join instead of
+# passing the ids from the in-process tag index
+TAG_INDEX_MAX_IDS = 5000
+
+# Upper bounds of the price buckets reported by /api/catalog/facets
+CATALOG_PRICE_BUCKETS = [100, 500, 1000, 5000, 10000]
+
+# Seconds catalog facet counts stay cached
+CATALOG_FACETS_CACHE_TIMEOUT = 300
+
+# Popularity ranking: weight of a review and of a unit sold, and the number
+# of days after which an event counts half as much
+POPULARITY_REVIEW_WEIGHT = 3.0
+POPULARITY_UNIT_WEIGHT = 1.0
+POPULARITY_HALF_LIFE_DAYS = 30
+
+# Most product ids accepted by /api/products?ids=
+PRODUCT_BATCH_MAX_IDS = 100
+
+# Latest reviews embedded in product details; the rest are paginated at
+# /api/product/<id>/reviews
+PRODUCT_DETAIL_REVIEWS = 5
+
+# Queue posted reviews and answer 202 instead of publishing them at once;
+# `manage.py drain_review_queue` publishes them in batches of this size
+REVIEW_QUEUE_ENABLED = False
+REVIEW_QUEUE_BATCH_SIZE = 500
+
+# Formatted timestamps kept by the serializers' LRU cache
+DATETIME_FORMAT_CACHE_SIZE = 4096
+
+# Widths (in pixels) and formats of the renditions generated for product
+# images and category icons by `manage.py render_images`, which processes
+# them in batches of IMAGE_RENDITION_BATCH_SIZE; the first format is the
+# preferred one for admin thumbnails
+IMAGE_RENDITION_WIDTHS = [160, 320, 640, 1280]
+IMAGE_RENDITION_FORMATS = ["webp", "jpeg"]
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_RENDITION_BATCH_SIZE = 20